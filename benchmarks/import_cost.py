@@ -0,0 +1,76 @@
+"""
+Report the cold import cost of every dauto submodule.
+
+Each module is imported in a fresh interpreter with a minimal django configuration, so the time includes every module
+it pulls in. Modules whose optional dependencies are missing are reported as skipped.
+
+Usage:
+    python benchmarks/import_cost.py [--repeat 5]
+"""
+
+import argparse
+import pkgutil
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+PROBE = """
+import sys, time
+import django
+from django.conf import settings
+
+settings.configure(
+    INSTALLED_APPS=["django.contrib.contenttypes", "django.contrib.auth"],
+    DATABASES={"default": {"ENGINE": "django.db.backends.sqlite3", "NAME": ":memory:"}},
+)
+django.setup()
+start = time.perf_counter()
+try:
+    __import__(sys.argv[1])
+except ImportError as e:
+    print(f"skip {e}")
+else:
+    print(time.perf_counter() - start)
+"""
+
+
+def submodules() -> list[str]:
+    import dauto
+
+    return ["dauto"] + sorted(
+        module.name for module in pkgutil.walk_packages(dauto.__path__, "dauto.")
+    )
+
+
+def measure(module: str, repeat: int) -> float | str:
+    best = None
+    for _ in range(repeat):
+        output = subprocess.run(
+            [sys.executable, "-c", PROBE, module], capture_output=True, text=True, cwd=ROOT
+        )
+        result = output.stdout.strip() or output.stderr.strip().splitlines()[-1]
+        try:
+            elapsed = float(result)
+        except ValueError:
+            return result
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=5, help="imports per module, the best one is reported")
+    args = parser.parse_args()
+
+    sys.path.insert(0, str(ROOT))
+    results = [(module, measure(module, args.repeat)) for module in submodules()]
+    width = max(len(module) for module, _ in results)
+    for module, result in sorted(results, key=lambda r: -r[1] if isinstance(r[1], float) else 0):
+        cost = f"{result * 1000:8.2f} ms" if isinstance(result, float) else result
+        print(f"{module:<{width}}  {cost}")
+
+
+if __name__ == "__main__":
+    main()
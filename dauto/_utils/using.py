@@ -1,9 +1,11 @@
+import functools
 import importlib
 
 
+@functools.cache
 def using(path: str):
     """
-    Retrieve an attribute from a module.
+    Retrieve an attribute from a module, memoized per path.
 
     Parameters:
         path (str): The fully qualified path of the attribute, in the format 'module_name.class_name'.
@@ -1,6 +1,18 @@
 # # Database
 
+import contextvars
+import itertools
+import random
+import re
+import threading
+import time
+import typing
 import urllib.parse as urlparse
+import weakref
+from contextlib import contextmanager
+
+from django.core.exceptions import ImproperlyConfigured
+from django.db.backends.signals import connection_created
 
 # When we deploy Django projects usually we get the database url as a configuration **string** so it's tricky
 # destructure that configuration string in a proper database configuration for django. This module try to
@@ -22,10 +34,253 @@ SCHEMES = {
 }
 
 
+# Query string values are strings, but many driver options aren't. A string where the driver expects an int may
+# be silently ignored or break only at connection time, so we type the well known performance options.
+
+
+def _bool(value: str) -> bool:
+    lowered = value.strip().lower()
+    if lowered in ("1", "true", "yes", "on"):
+        return True
+    if lowered in ("0", "false", "no", "off"):
+        return False
+    raise ValueError(f"'{value}' is not a boolean")
+
+
+def _int_or_none(value: str) -> int | None:
+    # psycopg disables prepared statements with `prepare_threshold=None`, needed behind PgBouncer transaction pools
+    if value.strip().lower() in ("", "none", "null"):
+        return None
+    return int(value)
+
+
+OPTION_TYPES = {
+    "connect_timeout": int,
+    "prepare_threshold": _int_or_none,
+    "server_side_binding": _bool,
+    "assume_role": str,
+}
+
+# Some of them are not driver options but settings of the connection itself
+
+SETTING_TYPES = {
+    "DISABLE_SERVER_SIDE_CURSORS": _bool,
+}
+
+# Django (>= 5.1) supports psycopg3 connection pools through `OPTIONS["pool"]`, either `True` for the default pool
+# or the `psycopg_pool.ConnectionPool` arguments. We take them from `pool` and `pool_<argument>` params.
+
+POOL_TYPES = {
+    "min_size": int,
+    "max_size": int,
+    "max_waiting": int,
+    "timeout": float,
+    "max_lifetime": float,
+    "max_idle": float,
+    "reconnect_timeout": float,
+    "num_workers": int,
+}
+
+
+def _typed(key: str, value: str, types: dict):
+    try:
+        return types[key](value)
+    except ValueError as e:
+        raise ImproperlyConfigured(f"Invalid value for database option '{key}': {e}")
+
+
+# SQLite performance relies on pragmas (WAL journal, bigger page cache, memory mapped IO...) that only live as long
+# as the connection does, so we take them from the url, validate them and apply them on every new connection.
+
+
+def _choice(*choices: str):
+    def parse(value: str) -> str:
+        upper = value.strip().upper()
+        if upper not in choices:
+            raise ValueError(f"'{value}' is not one of {', '.join(choices)}")
+        return upper
+
+    return parse
+
+
+def _positive_int(value: str) -> int:
+    number = int(value)
+    if number < 0:
+        raise ValueError(f"'{value}' is negative")
+    return number
+
+
+SQLITE_PRAGMA_TYPES = {
+    # applied in this order, busy timeout first so changing the journal waits for locks
+    "busy_timeout": _positive_int,
+    "journal_mode": _choice("DELETE", "TRUNCATE", "PERSIST", "MEMORY", "WAL", "OFF"),
+    "synchronous": _choice("OFF", "NORMAL", "FULL", "EXTRA", "0", "1", "2", "3"),
+    "cache_size": int,
+    "mmap_size": _positive_int,
+    "temp_store": _choice("DEFAULT", "FILE", "MEMORY", "0", "1", "2"),
+}
+
+
+# noinspection PyUnusedLocal
+def _apply_sqlite_pragmas(sender, connection, **kwargs):
+    pragmas = connection.settings_dict.get("PRAGMAS")
+    if connection.vendor != "sqlite" or not pragmas:
+        return
+    with connection.cursor() as cursor:
+        for name in SQLITE_PRAGMA_TYPES:
+            if name in pragmas:
+                cursor.execute(f"PRAGMA {name} = {pragmas[name]}")
+
+
+connection_created.connect(_apply_sqlite_pragmas, dispatch_uid="dauto_sqlite_pragmas")
+
+
+# A fixed `search_path` per alias means one alias, and one set of connections, per tenant. In tenant schemas mode
+# a single (pooled) alias serves every schema: the active schema lives in a context variable (see `use_schema`
+# and `TenantSchemaMiddleware`) and a `SET search_path` is run before a query only when the connection was left
+# on another schema. The schema applied on each driver connection is tracked so pooled connections are reused
+# across tenants without resetting them.
+
+# ??? warning
+#
+# `SET` is transactional, a search path changed inside a transaction is forgotten on rollback. A path set inside an
+# atomic block is only trusted while its `on_commit` marker is pending (the transaction, or the savepoint that set it,
+# is alive) or once it was committed, a rolled back path is set again by the next query. In manual transactions
+# (`autocommit` off outside atomic blocks) the path is set before every query.
+
+_SCHEMA_NAME = re.compile(r"[A-Za-z_][A-Za-z0-9_$]*")
+_schema = contextvars.ContextVar("dauto_schema", default=None)
+_applied_schemas = weakref.WeakKeyDictionary()
+
+
+@contextmanager
+def use_schema(schema: str):
+    """
+    Context manager activating a schema (or a comma separated list of schemas) for tenant schemas databases
+    """
+    for name in schema.split(","):
+        if not _SCHEMA_NAME.fullmatch(name.strip()):
+            raise ValueError(f"Invalid schema name '{name}'")
+    token = _schema.set(schema)
+    try:
+        yield
+    finally:
+        _schema.reset(token)
+
+
+# A streaming response body is read by the server after the middlewares returned, out of their context. The body
+# iteration is wrapped to re-enter the request context around every chunk (not across them, a chunk may be produced
+# in another context by ASGI servers).
+
+def _scoped_chunks(content, scope: typing.Callable):
+    iterator = iter(content)
+    while True:
+        with scope():
+            try:
+                chunk = next(iterator)
+            except StopIteration:
+                return
+        yield chunk
+
+
+async def _ascoped_chunks(content, scope: typing.Callable):
+    iterator = aiter(content)
+    while True:
+        with scope():
+            try:
+                chunk = await anext(iterator)
+            except StopAsyncIteration:
+                return
+        yield chunk
+
+
+def _stream_within(response, scope: typing.Callable):
+    """
+    Make the body of a streaming response be produced inside `scope()`
+    """
+    # files served with the server file wrapper run no queries, keep them on that path
+    if getattr(response, "streaming", False) and getattr(response, "file_to_stream", None) is None:
+        content = response.streaming_content
+        wrap = _ascoped_chunks if getattr(response, "is_async", False) else _scoped_chunks
+        response.streaming_content = wrap(content, scope)
+    return response
+
+
+_MANUAL = object()
+
+
+def _is_current(connection, marker) -> bool:
+    """
+    Check if a search path applied with `marker` still holds on the connection
+    """
+    if marker is None:
+        return True
+    if marker is _MANUAL:
+        return False
+    # rollbacks (of the transaction or the savepoint) discard the pending `on_commit` callbacks
+    return any(func is marker for _, func, *_ in connection.run_on_commit)
+
+
+def _switch_schema(execute, sql, params, many, context):
+    connection = context["connection"]
+    schema = _schema.get() or connection.settings_dict["DEFAULT_SCHEMA"]
+    raw = connection.connection
+    applied = _applied_schemas.get(raw)
+    if applied is None or applied[0] != schema or not _is_current(connection, applied[1]):
+        search_path = ", ".join(connection.ops.quote_name(name.strip()) for name in schema.split(","))
+        context["cursor"].cursor.execute(f"SET search_path TO {search_path}")
+        marker = None
+        if connection.in_atomic_block:
+            def marker():
+                if _applied_schemas.get(raw, (None, None))[1] is marker:
+                    _applied_schemas[raw] = (schema, None)
+
+            connection.on_commit(marker)
+        elif not connection.get_autocommit():
+            marker = _MANUAL
+        _applied_schemas[raw] = (schema, marker)
+    return execute(sql, params, many, context)
+
+
+# noinspection PyUnusedLocal
+def _install_schema_switch(sender, connection, **kwargs):
+    if connection.settings_dict.get("TENANT_SCHEMAS") and _switch_schema not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_switch_schema)
+
+
+connection_created.connect(_install_schema_switch, dispatch_uid="dauto_tenant_schemas")
+
+
+class TenantSchemaMiddleware:
+    """
+    Middleware activating the schema of each request. Subclass it and override `get_schema` to resolve the tenant
+    (e.g. from the host or the authenticated user), never trust a schema sent by the client as is.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def get_schema(self, request) -> str | None:
+        """
+        Return the schema of the request or `None` to use the default one
+        """
+        raise NotImplementedError(".get_schema() must be overridden")
+
+    def __call__(self, request):
+        schema = self.get_schema(request)
+        if schema is None:
+            return self.get_response(request)
+        with use_schema(schema):
+            response = self.get_response(request)
+        return _stream_within(response, lambda: use_schema(schema))
+
+
 # Then we build the magic method that with a very few parameters alongside the url configuration return
 # a valid django configuration for databases.
 
-def database(url, engine=None, conn_max_age=0, conn_health_checks=False, **options):
+def database(
+        url, engine=None, conn_max_age=0, conn_health_checks=False, pool=None, tenant_schemas=None, **options
+):
     """
     The `database` method is used to parse a database URL and return a configuration dictionary for connecting to the database.
 
@@ -34,18 +289,29 @@ def database(url, engine=None, conn_max_age=0, conn_health_checks=False, **optio
          engine (string, optional): The database engine to use. Defaults to `None`.
          conn_max_age (int, optional): The maximum age of database connections in seconds. Defaults to `0`.
          conn_health_checks (bool, optional): Indicates whether to perform health checks on database connections. Defaults to `False`.
+         pool (bool | dict, optional): psycopg3 connection pool, `True` or the pool arguments. Merged with the `pool` and `pool_<argument>` query params. Defaults to `None`.
+         tenant_schemas (bool, optional): Switch the postgres schema per context instead of fixing it per connection, `currentSchema` becomes the default one. Also taken from the `tenant_schemas` query param. Defaults to `None`.
          **options (dict, optional): Additional database connection options. These will be added to the configuration dictionary.
 
     Returns:
         config (dict): The configuration dictionary for connecting to the database.
     """
 
-    if url == "sqlite://:memory:":
+    memory_url, _, memory_query = url.partition("?")
+    if memory_url == "sqlite://:memory:":
         # this is a special case, because if we pass this URL into
         # urlparse, urlparse will choke trying to interpret "memory"
         # as a port number
-        return {"ENGINE": SCHEMES["sqlite"], "NAME": ":memory:"}
-        # note: no other settings are required for sqlite
+        config = {"ENGINE": SCHEMES["sqlite"], "NAME": ":memory:"}
+        # note: no other settings than pragmas are required for sqlite
+        pragmas = {
+            key: _typed(key, values[-1], SQLITE_PRAGMA_TYPES)
+            for key, values in urlparse.parse_qs(memory_query).items()
+            if key in SQLITE_PRAGMA_TYPES
+        }
+        if pragmas:
+            config["PRAGMAS"] = pragmas
+        return config
 
     # otherwise parse the url as normal
     config = {}
@@ -94,15 +360,59 @@ def database(url, engine=None, conn_max_age=0, conn_health_checks=False, **optio
         }
     )
 
+    pool_options = {}
+    pragmas = {}
     for key, values in query.items():
         if url.scheme == "mysql" and key == "ssl-ca":
             options["ssl"] = {"ca": values[-1]}
             continue
 
+        if url.scheme == "sqlite" and key in SQLITE_PRAGMA_TYPES:
+            pragmas[key] = _typed(key, values[-1], SQLITE_PRAGMA_TYPES)
+            continue
+
+        if key == "tenant_schemas":
+            tenant_schemas = _typed(key, values[-1], {key: _bool}) if tenant_schemas is None else tenant_schemas
+            continue
+
+        if key == "pool":
+            pool = _typed(key, values[-1], {"pool": _bool}) if pool is None else pool
+            continue
+
+        if key.startswith("pool_") and key[5:] in POOL_TYPES:
+            pool_options[key[5:]] = _typed(key[5:], values[-1], POOL_TYPES)
+            continue
+
+        if key.upper() in SETTING_TYPES:
+            config[key.upper()] = _typed(key.upper(), values[-1], SETTING_TYPES)
+            continue
+
+        if key in OPTION_TYPES:
+            options[key] = _typed(key, values[-1], OPTION_TYPES)
+            continue
+
         options[key] = values[-1]
 
+    # Pool configuration, the pool arguments alone are enough to enable it
+    if pool_options and pool is not False:
+        pool = {**pool_options, **(pool if isinstance(pool, dict) else {})}
+    if pool:
+        if url.scheme != "postgres":
+            raise ImproperlyConfigured("Connection pools are only supported by the postgres engine")
+        if conn_max_age:
+            raise ImproperlyConfigured("Connection pools don't support persistent connections, use conn_max_age=0")
+        options["pool"] = pool
+
+    if pragmas:
+        config["PRAGMAS"] = pragmas
+
     # Support for Postgres Schema URLs
-    if "currentSchema" in options and engine == "django.db.backends.postgresql":
+    if tenant_schemas:
+        if url.scheme != "postgres":
+            raise ImproperlyConfigured("Tenant schemas are only supported by the postgres engine")
+        config["TENANT_SCHEMAS"] = True
+        config["DEFAULT_SCHEMA"] = options.pop("currentSchema", "public")
+    elif "currentSchema" in options and engine == "django.db.backends.postgresql":
         options["options"] = "-c search_path={0}".format(options.pop("currentSchema"))
 
     if options:
@@ -112,3 +422,196 @@ def database(url, engine=None, conn_max_age=0, conn_health_checks=False, **optio
         config["ENGINE"] = engine
 
     return config
+
+
+# ## Read replicas
+
+# Scaling reads means more aliases and a router. `databases` builds the whole `DATABASES` mapping from a primary
+# url and a list of replica urls (each one optionally with a weight), using `database` for each of them.
+
+def databases(
+    primary: str,
+    replicas: typing.Iterable[str | tuple[str, int]] = (),
+    alias: str = "default",
+    replica_prefix: str = "replica",
+    **kwargs,
+) -> dict:
+    """
+    Build a `DATABASES` mapping with a primary database and its read replicas.
+
+    Parameters:
+         primary (string): The URL of the primary database.
+         replicas (list, optional): The URLs of the replicas, or `(url, weight)` tuples. Weight defaults to `1`.
+         alias (string, optional): The alias of the primary database. Defaults to `default`.
+         replica_prefix (string, optional): The replicas alias prefix, replicas are named `<prefix>_<index>`. Defaults to `replica`.
+         **kwargs (dict, optional): Arguments of the `database` method used for every database.
+
+    Returns:
+        config (dict): The `DATABASES` configuration, to use alongside `ReplicaRouter`.
+    """
+    config = {alias: database(primary, **kwargs)}
+    for index, replica in enumerate(replicas):
+        url, weight = replica if isinstance(replica, tuple) else (replica, 1)
+        config[f"{replica_prefix}_{index}"] = {
+            **database(url, **kwargs),
+            "PRIMARY": alias,
+            "WEIGHT": weight,
+            "TEST": {"MIRROR": alias},
+        }
+    return config
+
+
+# Then the router sends writes to the primary and reads to the replicas. Once a request (or any context) writes,
+# its next reads go to the primary too, so it reads its own writes regardless of the replica lag. Replicas are
+# health checked at most once per `health_check_interval` seconds and kept out of rotation for `retry_interval`
+# seconds when they fail.
+
+# ??? warning
+#
+# The pinning lives in a context variable, add the `ReplicaPinningMiddleware` to scope it to each request, otherwise
+# a long living thread keeps reading from the primary after its first write.
+
+_pinned = contextvars.ContextVar("dauto_primary_pinned", default=False)
+
+
+@contextmanager
+def pin_primary():
+    """
+    Context manager routing every read to the primary database
+    """
+    token = _pinned.set(True)
+    try:
+        yield
+    finally:
+        _pinned.reset(token)
+
+
+@contextmanager
+def _unpinned():
+    token = _pinned.set(False)
+    try:
+        yield
+    finally:
+        _pinned.reset(token)
+
+
+class ReplicaRouter:
+    """
+    Database router for the `DATABASES` built with `databases`. Set `strategy` to `weighted` to pick replicas by
+    weight instead of round-robin.
+
+    DATABASE_ROUTERS = ["dauto.database.ReplicaRouter"]
+    """
+
+    ROUND_ROBIN = "round-robin"
+    WEIGHTED = "weighted"
+
+    strategy = ROUND_ROBIN
+    health_check_interval = 10.0
+    retry_interval = 30.0
+
+    def __init__(self):
+        self._counter = itertools.count()
+        self._lock = threading.Lock()
+        self._checked: dict[str, float] = {}
+        self._down: dict[str, float] = {}
+
+    # noinspection PyMethodMayBeStatic
+    def get_replicas(self, primary: str) -> dict[str, int]:
+        """
+        Return the replicas of a primary alias with their weights
+        """
+        from django.conf import settings
+
+        return {
+            alias: config.get("WEIGHT", 1)
+            for alias, config in settings.DATABASES.items()
+            if config.get("PRIMARY") == primary
+        }
+
+    # noinspection PyMethodMayBeStatic
+    def get_primary(self) -> str:
+        from django.db import DEFAULT_DB_ALIAS
+
+        return DEFAULT_DB_ALIAS
+
+    # noinspection PyMethodMayBeStatic
+    def check(self, alias: str) -> bool:
+        """
+        Health check of a replica
+        """
+        from django.db import connections
+
+        # noinspection PyBroadException
+        try:
+            connection = connections[alias]
+            connection.ensure_connection()
+            return connection.is_usable()
+        except Exception:
+            return False
+
+    def mark_down(self, alias: str):
+        """
+        Take a replica out of rotation for `retry_interval` seconds
+        """
+        with self._lock:
+            self._down[alias] = time.monotonic() + self.retry_interval
+
+    def is_healthy(self, alias: str) -> bool:
+        now = time.monotonic()
+        with self._lock:
+            if self._down.get(alias, 0) > now:
+                return False
+            if now - self._checked.get(alias, float("-inf")) < self.health_check_interval:
+                return True
+            self._checked[alias] = now
+        if self.check(alias):
+            return True
+        self.mark_down(alias)
+        return False
+
+    def db_for_read(self, model, **hints):
+        primary = self.get_primary()
+        if _pinned.get():
+            return primary
+
+        replicas = {alias: weight for alias, weight in self.get_replicas(primary).items() if self.is_healthy(alias)}
+        if not replicas:
+            return primary
+        if self.strategy == self.WEIGHTED:
+            return random.choices(list(replicas), weights=list(replicas.values()))[0]
+        return list(replicas)[next(self._counter) % len(replicas)]
+
+    def db_for_write(self, model, **hints):
+        _pinned.set(True)
+        return self.get_primary()
+
+    def allow_relation(self, obj1, obj2, **hints):
+        primary = self.get_primary()
+        aliases = {primary, *self.get_replicas(primary)}
+        if obj1._state.db in aliases and obj2._state.db in aliases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db in self.get_replicas(self.get_primary()):
+            return False
+        return None
+
+
+class ReplicaPinningMiddleware:
+    """
+    Middleware scoping the read-your-writes pinning of `ReplicaRouter` to each request
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        token = _pinned.set(False)
+        try:
+            response = self.get_response(request)
+            pinned = _pinned.get()
+        finally:
+            _pinned.reset(token)
+        return _stream_within(response, pin_primary if pinned else _unpinned)
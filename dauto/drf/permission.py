@@ -1,7 +1,14 @@
 # # Permissions
 
+import functools
+import threading
 import typing
+from django.apps import apps
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache as default_cache
 from django.db import models
+from django.db.models import signals
 from rest_framework import permissions, exceptions
 
 M = typing.TypeVar("M", bound=models.Model)
@@ -12,6 +19,12 @@ M = typing.TypeVar("M", bound=models.Model)
 
 class _BaseApiFunctionViewModelPermissions(permissions.BasePermission):
     model = None
+    required_permissions: dict[str, list[str]] = {}
+
+    # shared permission cache, see below
+    cache_permissions = False
+    cache = default_cache
+    cache_timeout = 300
 
     perms_map = {
         "GET": [],
@@ -25,21 +38,46 @@ class _BaseApiFunctionViewModelPermissions(permissions.BasePermission):
 
     authenticated_users_only = True
 
+    # The permission codes only depend on the model and the method, so they are formatted once when the class is
+    # created instead of on every request.
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        if cls.model is not None:
+            # noinspection PyProtectedMember
+            format_kwargs = {
+                "app_label": cls.model._meta.app_label,
+                "model_name": cls.model._meta.model_name,
+            }
+            cls.required_permissions = {
+                method: [perm % format_kwargs for perm in perms] for method, perms in cls.perms_map.items()
+            }
+        if cls.cache_permissions:
+            use_permission_cache(cls.cache)
+
     def get_required_permissions(self, method):
         """
         Given a models and an HTTP method, return the list of permission codes that the user is required to have.
         """
-
-        # noinspection PyProtectedMember
-        kwargs = {
-            "app_label": self.model._meta.app_label,
-            "model_name": self.model._meta.model_name,
-        }
-
-        if method not in self.perms_map:
+        if method not in self.required_permissions:
             raise exceptions.MethodNotAllowed(method)
 
-        return [perm % kwargs for perm in self.perms_map[method]]
+        return self.required_permissions[method]
+
+    def user_has_perms(self, user, perms) -> bool:
+        """
+        Check the user permissions, through the shared permission cache if `cache_permissions` is enabled
+        """
+        if not perms:
+            return True
+        if not self.cache_permissions or user.pk is None:
+            return user.has_perms(perms)
+        if not user.is_active:
+            return False
+        if user.is_superuser:
+            return True
+        granted = get_cached_permissions(user, self.cache, self.cache_timeout)
+        return all(perm in granted for perm in perms)
 
     def has_permission(self, request, view):
         # Workaround to ensure DjangoModelPermissions are not applied
@@ -54,24 +92,167 @@ class _BaseApiFunctionViewModelPermissions(permissions.BasePermission):
 
         perms = self.get_required_permissions(request.method)
 
-        return request.user.has_perms(perms)
+        return self.user_has_perms(request.user, perms)
 
 
 # and then a function that can build other permission classes (not instances) using the previous class as base
 # and the model as a parameter
 
-def permissions_for(model: typing.Generic[M]) -> type:
+def permissions_for(model: typing.Generic[M], cache_permissions: bool = False) -> type:
     """
     Create a dynamic permission class for the given model.
 
     Parameters:
         model: The model object for which the permissions class is being generated.
+        cache_permissions: Whether to check the user permissions through the shared permission cache.
 
     Returns:
         type: The dynamically created permission class.
     """
     return type(
-        f"{model.__class__.__name__}ModelPermission",
+        f"{model.__name__}ModelPermission",
         (_BaseApiFunctionViewModelPermissions,),
         locals(),
     )
+
+
+# ## Permission cache
+
+# `user.has_perms` loads every user and group permission from the database the first time it's called on a user
+# object, and each request brings a fresh user object. With `cache_permissions` the permission set of each user is
+# kept in the Django cache and shared between requests (and processes). Entries are invalidated by signals:
+#
+# - changes on the user permissions or groups of a user drop that user entry,
+# - changes on groups, group permissions or permissions bump a generation number that invalidates every entry.
+
+# The invalidation receivers are connected (to the user, group and permission models only) once a permission class
+# with `cache_permissions` is defined, and invalidate every cache used by those classes.
+
+# ??? warning
+#
+# Processes changing permissions without defining those classes (workers, commands) must call
+# `use_permission_cache(cache)` (e.g. in your `AppConfig.ready`). Changes made with queryset `update`/`delete` or raw
+# SQL don't send signals and need a `clear_permission_cache()` call.
+
+PERMISSION_CACHE_PREFIX = "dauto:permissions"
+_GENERATION_KEY = f"{PERMISSION_CACHE_PREFIX}:generation"
+
+# caches holding permission sets
+_caches: list = []
+_caches_lock = threading.Lock()
+
+
+def _user_key(pk) -> str:
+    return f"{PERMISSION_CACHE_PREFIX}:user:{pk}"
+
+
+def use_permission_cache(cache=default_cache):
+    """
+    Register a cache holding permission sets, so it's invalidated on permission changes, and connect the invalidation
+    receivers
+    """
+    with _caches_lock:
+        if not any(used is cache for used in _caches):
+            _caches.append(cache)
+    _connect_receivers()
+
+
+def get_cached_permissions(user, cache=default_cache, timeout=300) -> frozenset[str]:
+    """
+    Return the permission codes of a user, from the shared cache if possible
+
+    Parameters:
+        user: The user
+        cache: The cache storing the permission sets
+        timeout: Seconds the permission set is kept
+
+    Returns:
+        frozenset: The permission codes of the user
+    """
+    use_permission_cache(cache)
+    key = _user_key(user.pk)
+    values = cache.get_many([_GENERATION_KEY, key])
+    generation = values.get(_GENERATION_KEY, 0)
+    entry = values.get(key)
+    if entry is not None and entry[0] == generation:
+        return entry[1]
+
+    granted = frozenset(user.get_all_permissions())
+    cache.set(key, (generation, granted), timeout)
+    return granted
+
+
+def clear_permission_cache(user_pks: typing.Iterable | None = None, cache=None):
+    """
+    Invalidate the cached permission sets of some users, or all of them if no user is given, in a cache or in every
+    cache in use
+    """
+    caches = [cache] if cache is not None else list(_caches) or [default_cache]
+    if user_pks is not None:
+        keys = [_user_key(pk) for pk in user_pks]
+        for used in caches:
+            used.delete_many(keys)
+        return
+    for used in caches:
+        try:
+            used.incr(_GENERATION_KEY)
+        except ValueError:
+            used.add(_GENERATION_KEY, 1, None)
+
+
+# noinspection PyUnusedLocal
+def _on_save(sender, instance, **kwargs):
+    from django.contrib.auth.models import Group, Permission
+
+    user_model = get_user_model()
+    if sender is user_model:
+        clear_permission_cache([instance.pk])
+    elif sender in (Group, Permission):
+        clear_permission_cache()
+
+
+# noinspection PyUnusedLocal
+def _on_m2m_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    from django.contrib.auth.models import Group
+
+    if not action.startswith("post_"):
+        return
+    user_model = get_user_model()
+    user_through = {
+        getattr(user_model, name).through
+        for name in ("user_permissions", "groups")
+        if hasattr(user_model, name)
+    }
+    if sender in user_through:
+        if isinstance(instance, user_model):
+            clear_permission_cache([instance.pk])
+        elif pk_set is not None:
+            clear_permission_cache(pk_set)
+        else:
+            # a clear from the group or permission side, we don't know which users were related
+            clear_permission_cache()
+    elif sender is Group.permissions.through:
+        clear_permission_cache()
+
+
+@functools.cache
+def _connect_receivers():
+    # connected once the auth models are loaded, a permission class may be defined before the apps are ready
+    user_app, user_model_name = settings.AUTH_USER_MODEL.split(".")
+
+    def connect(user_model, group_model, permission_model):
+        for model in (user_model, group_model, permission_model):
+            signals.post_save.connect(_on_save, sender=model, dispatch_uid="dauto_permission_cache_save")
+            signals.post_delete.connect(_on_save, sender=model, dispatch_uid="dauto_permission_cache_delete")
+        for name in ("user_permissions", "groups"):
+            if hasattr(user_model, name):
+                signals.m2m_changed.connect(
+                    _on_m2m_changed, sender=getattr(user_model, name).through, dispatch_uid="dauto_permission_cache_m2m"
+                )
+        signals.m2m_changed.connect(
+            _on_m2m_changed, sender=group_model.permissions.through, dispatch_uid="dauto_permission_cache_m2m"
+        )
+
+    apps.lazy_model_operation(
+        connect, (user_app, user_model_name.lower()), ("auth", "group"), ("auth", "permission")
+    )
@@ -0,0 +1,408 @@
+# # Query planner
+
+import typing
+from dataclasses import dataclass, field
+
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Model, Prefetch, QuerySet
+from rest_framework import fields as drf_fields
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.relations import (
+    HyperlinkedIdentityField,
+    HyperlinkedRelatedField,
+    ManyRelatedField,
+    PrimaryKeyRelatedField,
+    RelatedField,
+    SlugRelatedField,
+)
+from rest_framework.serializers import BaseSerializer, ListSerializer
+
+# A viewset usually picks a lean serializer for reading (a `list` serializer with four fields, say) but its queryset
+# is unaware of that choice, so it loads every column (large text and JSON ones included) and hits the database once
+# per row for each nested resource. The planner walks the serializer declarations and decides ahead of the evaluation:
+#
+# - the `select_related` paths for forward (and reverse one to one) relations that are rendered nested,
+# - the `prefetch_related` lookups, as `Prefetch` objects with their own planned queryset, for many relations,
+# - the `only()` columns when every rendered field maps to a column, otherwise the `defer()` of excluded columns.
+#
+# Plans are cached per serializer class. The RESTQL planner (`dauto.drf.restql.planner`) builds on this one to plan
+# the fields selected by the client too.
+
+# ??? note
+#
+# Method fields are opaque to the planner. Fields we can't map to a column (`SerializerMethodField`, properties,
+# `source="*"`) make the planner load every column of that model. A field can take part in the plan implementing
+# `contribute_to_plan(plan, field_name, parsed_query)`, as `HyperlinkedNestedSerializerMethodField` does.
+
+
+@dataclass
+class QueryPlan:
+    """
+    Eager loading and column selection to apply over a queryset of `model`
+    """
+
+    model: typing.Type[Model]
+    only: set[str] | None = field(default_factory=set)
+    defer: set[str] = field(default_factory=set)
+    select_related: set[str] = field(default_factory=set)
+    prefetch_related: list[tuple[str, "QueryPlan"]] = field(default_factory=list)
+
+    def load_all(self):
+        """
+        Stop restricting the loaded columns
+        """
+        self.only = None
+
+    def add_column(self, name: str):
+        if self.only is not None:
+            self.only.add(name)
+
+    def merge(self, prefix: str, nested: "QueryPlan"):
+        """
+        Merge the plan of a model reached through `select_related` at `prefix`
+        """
+        self.select_related.add(prefix)
+        self.select_related.update(f"{prefix}__{path}" for path in nested.select_related)
+        self.defer.update(f"{prefix}__{name}" for name in nested.defer)
+        for lookup, plan in nested.prefetch_related:
+            self.add_prefetch(f"{prefix}__{lookup}", plan)
+        if self.only is not None:
+            self.only.add(prefix)
+            if nested.only is not None:
+                self.only.update(f"{prefix}__{name}" for name in nested.only)
+
+    def combine(self, other: "QueryPlan"):
+        """
+        Load too what another plan of the same model loads
+        """
+        if self.only is None or other.only is None:
+            self.load_all()
+        else:
+            self.only.update(other.only)
+        self.defer &= other.defer
+        self.select_related.update(other.select_related)
+        for lookup, plan in other.prefetch_related:
+            self.add_prefetch(lookup, plan)
+
+    def add_prefetch(self, lookup: str, nested: "QueryPlan"):
+        """
+        Prefetch `lookup` with a plan, combined with the one already there (a relation may be rendered by many fields)
+        """
+        for seen, plan in self.prefetch_related:
+            if seen == lookup:
+                plan.combine(nested)
+                return
+        self.prefetch_related.append((lookup, nested))
+
+    def _walk(self, path: list[str]) -> tuple[typing.Type[Model], str] | None:
+        """
+        Join the forward relations of `path`, return the model reached and its prefix or `None` if it can't be joined
+        """
+        model = self.model
+        prefix = ""
+        for name in path:
+            try:
+                model_field = model._meta.get_field(name)
+            except FieldDoesNotExist:
+                return None
+            if not _is_forward(model_field):
+                return None
+            prefix = f"{prefix}__{name}" if prefix else name
+            self.add_column(prefix)
+            self.select_related.add(prefix)
+            model = model_field.related_model
+        return model, prefix
+
+    def add_relation(self, lookup: str, nested: "QueryPlan | None"):
+        """
+        Add a relation rendered nested (`nested` given) or as a hyperlink (`nested` is `None`)
+        """
+        *path, last = lookup.split("__")
+        walked = self._walk(path)
+        if walked is None:
+            self.load_all()
+            return
+        model, prefix = walked
+
+        try:
+            model_field = model._meta.get_field(last)
+        except FieldDoesNotExist:
+            self.load_all()
+            return
+        if not model_field.is_relation:
+            self.load_all()
+            return
+
+        full = f"{prefix}__{last}" if prefix else last
+        if nested is None:
+            if _is_forward(model_field):
+                self.add_column(full)
+            return
+
+        if _is_forward(model_field) or _is_reverse_one(model_field):
+            self.merge(full, nested)
+            if _is_reverse_one(model_field) and self.only is not None:
+                # the reverse side of one to one is not a column of this model
+                self.only.discard(full)
+            return
+
+        if model_field.one_to_many and nested.only is not None:
+            # prefetching needs the column pointing back to the parent
+            nested.only.add(model_field.field.name)
+        if prefix:
+            self.add_column(prefix)
+        self.add_prefetch(full, nested)
+
+    def add_source(self, source: str):
+        """
+        Add a field rendered from `source` (dotted source of a DRF field)
+        """
+        *path, last = source.split(".")
+        walked = self._walk(path)
+        if walked is None:
+            self.load_all()
+            return
+        model, prefix = walked
+
+        try:
+            model_field = model._meta.get_field(last)
+        except FieldDoesNotExist:
+            self.load_all()
+            return
+        full = f"{prefix}__{last}" if prefix else last
+        if model_field.concrete and not model_field.many_to_many:
+            self.add_column(full)
+        else:
+            self.load_all()
+
+    def add_keys(self, lookup: str, columns: typing.Iterable[str] | None = ()):
+        """
+        Prefetch the primary keys of a many relation rendered as a list of keys or hyperlinks, with the `columns` its
+        items read too (every column if `None`)
+        """
+        model = self.model
+        model_field = None
+        for name in lookup.split("__"):
+            try:
+                model_field = model._meta.get_field(name)
+            except FieldDoesNotExist:
+                self.load_all()
+                return
+            model = model_field.related_model
+            if model is None:
+                self.load_all()
+                return
+        keys = QueryPlan(model=model)
+        if columns is None:
+            keys.load_all()
+        for name in columns or ():
+            keys.add_source(name)
+        if model_field.one_to_many:
+            keys.add_column(model_field.field.name)
+        self.add_relation(lookup, keys)
+
+    def apply(self, queryset: QuerySet, columns: bool = True) -> QuerySet:
+        """
+        Return the queryset with the plan applied, only the eager loading if `columns` is false
+        """
+        if queryset._fields is not None:
+            # a `values()` queryset renders no model instances
+            return queryset
+        if self.select_related:
+            queryset = queryset.select_related(*sorted(self.select_related))
+        if self.prefetch_related:
+            queryset = queryset.prefetch_related(
+                *(
+                    Prefetch(lookup, queryset=plan.apply(plan.model._default_manager.all()))
+                    for lookup, plan in self.prefetch_related
+                )
+            )
+        if not columns:
+            return queryset
+        if queryset.query.deferred_loading != (frozenset(), True):
+            # the queryset already restricts its columns, combining both could defer what it needs
+            return queryset
+        if self.only is not None:
+            related = queryset.query.select_related
+            if related is True:
+                # every forward relation is joined, none of them can be deferred
+                return queryset
+            only = self.only | set(_related_paths(related)) if related else self.only
+            return queryset.only(self.model._meta.pk.name, *sorted(only))
+        if self.defer:
+            return queryset.defer(*sorted(self.defer))
+        return queryset
+
+
+def _related_paths(related: dict, prefix: str = "") -> typing.Iterator[str]:
+    """
+    Return the paths of a `query.select_related` tree
+    """
+    for name, nested in related.items():
+        path = f"{prefix}__{name}" if prefix else name
+        yield path
+        yield from _related_paths(nested, path)
+
+
+_fields_cache: dict[type, dict] = {}
+_plans_cache: dict[type, QueryPlan | None] = {}
+
+
+def _get_fields(serializer) -> dict:
+    """
+    Return the (unbound) fields declared by a serializer, cached per serializer class
+    """
+    if isinstance(serializer, ListSerializer):
+        serializer = serializer.child
+    klass = serializer if isinstance(serializer, type) else type(serializer)
+    if klass not in _fields_cache:
+        _fields_cache[klass] = klass().get_fields()
+    return _fields_cache[klass]
+
+
+def _get_model(serializer) -> typing.Type[Model] | None:
+    if isinstance(serializer, ListSerializer):
+        serializer = serializer.child
+    meta = getattr(serializer, "Meta", None)
+    return getattr(meta, "model", None)
+
+
+def _is_query(value) -> bool:
+    return hasattr(value, "included_fields")
+
+
+def _select(parsed_query, names: typing.Iterable[str]) -> tuple[list[str], dict]:
+    """
+    Return the field names selected by a RESTQL parsed query (the same way RESTQL does) and their nested queries,
+    every field if there is no query
+    """
+    names = list(names)
+    if parsed_query is None:
+        return names, {}
+
+    nested = {f.field_name: f for f in parsed_query.included_fields if _is_query(f)}
+    flat = [f for f in parsed_query.included_fields if not _is_query(f)]
+
+    if parsed_query.excluded_fields:
+        selected = [n for n in names if n not in parsed_query.excluded_fields]
+    elif "*" in flat:
+        selected = names
+    elif parsed_query.included_fields:
+        selected = [n for n in names if n in flat or n in nested]
+    else:
+        selected = []
+    return selected, nested
+
+
+def _is_forward(model_field) -> bool:
+    return model_field.is_relation and (model_field.many_to_one or model_field.one_to_one) and model_field.concrete
+
+
+def _is_reverse_one(model_field) -> bool:
+    return model_field.is_relation and model_field.one_to_one and not model_field.concrete
+
+
+def _item_columns(relation) -> list[str] | None:
+    """
+    Return the columns the items of a many relation field read besides the primary key, `None` if unknown
+    """
+    if isinstance(relation, PrimaryKeyRelatedField):
+        return []
+    if isinstance(relation, SlugRelatedField):
+        return [relation.slug_field]
+    if isinstance(relation, HyperlinkedRelatedField):
+        return [] if relation.lookup_field == "pk" else [relation.lookup_field]
+    # `StringRelatedField` and custom relations may read anything
+    return None
+
+
+def build_plan(serializer, parsed_query=None) -> QueryPlan | None:
+    """
+    Build the query plan of a serializer
+
+    Parameters:
+        serializer: The serializer class (or instance) rendering the queryset
+        parsed_query: An optional RESTQL parsed query, all fields by default
+
+    Returns:
+        QueryPlan: The plan or `None` if the serializer is not bound to a model
+    """
+    model = _get_model(serializer)
+    if model is None:
+        return None
+
+    plan = QueryPlan(model=model)
+    fields = _get_fields(serializer)
+    selected, nested_queries = _select(parsed_query, fields.keys())
+
+    for name in selected:
+        serializer_field = fields[name]
+        if getattr(serializer_field, "write_only", False):
+            continue
+
+        contribute = getattr(serializer_field, "contribute_to_plan", None)
+        if contribute is not None:
+            contribute(plan, name, nested_queries.get(name))
+            continue
+
+        if isinstance(serializer_field, HyperlinkedIdentityField):
+            plan.add_column(serializer_field.lookup_field)
+            continue
+
+        source = serializer_field.source or name
+        if source == "*" or isinstance(serializer_field, drf_fields.SerializerMethodField):
+            plan.load_all()
+            continue
+
+        if isinstance(serializer_field, BaseSerializer):
+            nested = build_plan(serializer_field, nested_queries.get(name))
+            if nested is None:
+                plan.load_all()
+                continue
+            plan.add_relation(source.replace(".", "__"), nested)
+        elif isinstance(serializer_field, ManyRelatedField):
+            plan.add_keys(source.replace(".", "__"), _item_columns(serializer_field.child_relation))
+        elif isinstance(serializer_field, RelatedField):
+            plan.add_relation(source.replace(".", "__"), None)
+        else:
+            plan.add_source(source)
+
+    return plan
+
+
+def plan(queryset: QuerySet, serializer, columns: bool = True) -> QuerySet:
+    """
+    Apply to a queryset the plan of a serializer rendering all its fields. Plans are cached per serializer class.
+
+    Parameters:
+        queryset: The queryset to plan
+        serializer: The serializer class rendering the queryset
+        columns: Whether to restrict the loaded columns too, or only apply the eager loading
+
+    Returns:
+        QuerySet: The planned queryset
+    """
+    klass = serializer if isinstance(serializer, type) else type(serializer)
+    if klass not in _plans_cache:
+        _plans_cache[klass] = build_plan(serializer)
+    query_plan = _plans_cache[klass]
+    if query_plan is None or query_plan.model is not queryset.model:
+        return queryset
+    return query_plan.apply(queryset, columns)
+
+
+# Then a viewset mixin plan the queryset of every read request with the serializer class resolved for it, combined
+# with `ByOperationSerializerMixin` or `ByVersionSerializerMixin` each action and version gets its own plan.
+
+# noinspection PyUnresolvedReferences
+class SerializerPlannerMixin:
+    """
+    Viewset mixin that applies `select_related`, `prefetch_related` and `only()`/`defer()` to the queryset of read
+    requests according to the serializer class.
+    """
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.request.method not in SAFE_METHODS:
+            return queryset
+        return plan(queryset, self.get_serializer_class())
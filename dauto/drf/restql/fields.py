@@ -3,14 +3,138 @@
 # We need to check if django_restql package is installed
 from django.core.exceptions import ImproperlyConfigured
 from django.db.models import Model
+from django.db.models.manager import BaseManager
 from django_restql.mixins import DynamicFieldsMixin
 
+from dauto.drf.planner import QueryPlan, build_plan
 from dauto.drf.reverse import URLConfig, reverse
 
 from django_restql.fields import DynamicSerializerMethodField
 from django_restql.parser import Query
+import typing
 from typing import Type
-from rest_framework.serializers import Serializer
+from rest_framework.serializers import ListSerializer, Serializer
+
+
+def query_fingerprint(parsed_query: Query) -> tuple:
+    """
+    Return a hashable representation of a parsed query, two queries selecting the same fields share the fingerprint
+    """
+    return (
+        tuple(
+            query_fingerprint(field) if isinstance(field, Query) else field
+            for field in parsed_query.included_fields
+        ),
+        tuple(parsed_query.excluded_fields),
+        tuple(sorted(parsed_query.aliases.items())),
+        tuple(sorted((k, repr(v)) for k, v in parsed_query.arguments.items())),
+    )
+
+
+def default_query() -> Query:
+    """
+    Return a query including all fields
+    """
+    return Query(
+        field_name=None,
+        included_fields=["*"],
+        excluded_fields=[],
+        aliases={},
+        arguments={},
+    )
+
+
+# ## Representation cache
+
+# Many parent rows usually point to the same related object (e.g. 300 orders from 5 customers), so the same nested
+# representation, or the same url, is built once per row. The `RepresentationCache` lives in the serializer context
+# (shared by every serializer of a response) and keeps each nested representation by serializer class, instance
+# pk and parsed query fingerprint, so repeated nested objects are serialized once per response.
+
+_MISSING = object()
+
+
+class RepresentationCache:
+    """
+    Response scoped cache of nested representations with hit/miss counters
+    """
+
+    context_key = "restql_representation_cache"
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self._representations = {}
+
+    @classmethod
+    def from_context(cls, context: dict) -> "RepresentationCache":
+        """
+        Return the cache stored in a serializer context, creating it on first use
+        """
+        cache = context.get(cls.context_key)
+        if cache is None:
+            cache = context[cls.context_key] = cls()
+        return cache
+
+    def get_many(self, keys: list, compute: typing.Callable[[list], typing.Iterable]) -> list:
+        """
+        Return the representations of `keys`, computing the missing ones in a single call
+
+        Parameters:
+            keys: The cache keys, `None` keys are never cached
+            compute: Function receiving the positions of the missing keys and returning their representations in
+                the same order
+
+        Returns:
+            list: The representations in the same order as `keys`
+        """
+        representations = [_MISSING] * len(keys)
+        missing, first_seen = [], {}
+        for position, key in enumerate(keys):
+            if key is None:
+                missing.append(position)
+                continue
+            value = self._representations.get(key, _MISSING)
+            if value is not _MISSING:
+                self.hits += 1
+                representations[position] = value
+            elif key in first_seen:
+                self.hits += 1
+            else:
+                first_seen[key] = position
+                missing.append(position)
+
+        if missing:
+            self.misses += len(missing)
+            for position, value in zip(missing, compute(missing)):
+                representations[position] = value
+                if keys[position] is not None:
+                    self._representations[keys[position]] = value
+
+        for position, key in enumerate(keys):
+            if representations[position] is _MISSING:
+                representations[position] = self._representations[key]
+        return representations
+
+    @property
+    def stats(self) -> dict:
+        return {"hits": self.hits, "misses": self.misses, "size": len(self._representations)}
+
+
+
+def _url_key(url_config: URLConfig) -> tuple | None:
+    key = (
+        "url",
+        url_config.view_name,
+        tuple(sorted((url_config.path_params or {}).items())),
+        tuple(sorted((url_config.query_params or {}).items())),
+    )
+    try:
+        hash(key)
+    except TypeError:
+        return None
+    return key
+
 
 # Addressing Over-fetching and Under-fetching in RESTful APIs
 # RESTful APIs often suffer from over-fetching and under-fetching issues due to their rigid approach to handling response payloads.
@@ -48,9 +172,17 @@ class HyperlinkedNestedSerializerMethodField(DynamicSerializerMethodField):
         many (bool, optional): Whether the field should handle multiple related instances. Defaults to `False`.
         method_name (str): The name of the method on the parent serializer responsible for
             providing the URL configuration. By default, is resolved with get_<field_name>
+        bulk_method_name (str, optional): The name of the method on the parent serializer that resolves the whole
+            parent page at once. By default, is resolved with get_<field_name>_bulk. If the parent serializer does not
+            define it the per-row method is used.
+        relation (str, optional): The model relation traversed by the method, using the django lookup syntax
+            (e.g. `customer` or `customer__orders`). Only used to plan the queryset. Defaults to the field name.
+        cache_representations (bool, optional): Whether to reuse the representations of repeated nested objects
+            and urls through the `RepresentationCache` of the serializer context. Defaults to `True`.
 
     Raises:
         ImproperlyConfigured: If the method specified in `method_name` does not return a tuple with the instance(s) to serialize and a `URLConfig`.
+            Also if the bulk method does not return one tuple per parent object.
 
     Example:
         class ExampleSerializer(serializers.Serializer):
@@ -67,6 +199,17 @@ class HyperlinkedNestedSerializerMethodField(DynamicSerializerMethodField):
                 )
 
                 return instance, url_config
+
+            # Optional, used instead of the previous one when the parent serializer is a list
+            def get_related_resource_bulk(self, objs, parsed_query):
+                related = {r.pk: r for r in Related.objects.filter(pk__in=[o.related_id for o in objs])}
+                return [
+                    (
+                        related[o.related_id],
+                        URLConfig(view_name="related-resource-detail", path_params={"pk": o.related_id})
+                    )
+                    for o in objs
+                ]
     """
 
     def __init__(
@@ -74,59 +217,208 @@ class HyperlinkedNestedSerializerMethodField(DynamicSerializerMethodField):
         serializer_class: Type[Serializer],
         many: bool = False,
         method_name: str = None,
+        bulk_method_name: str = None,
+        relation: str = None,
+        cache_representations: bool = True,
         **kwargs,
     ):
         super().__init__(method_name=method_name, **kwargs)
 
         self.serializer_class = serializer_class
         self.many = many
+        self.bulk_method_name = bulk_method_name
+        self.relation = relation
+        self.cache_representations = cache_representations
+        self._fingerprint = None
+        self._bulk_page = None
+        self._bulk_objs = None
+        self._bulk_representations = None
 
-    # noinspection PyTypeChecker,PyUnresolvedReferences,PyCallingNonCallable
-    def to_representation(self, value):
-        method = getattr(self.parent, self.method_name)
-
+    def get_parsed_query(self) -> Query:
+        """
+        Return the query parsed by RESTQL for this field or a query including all fields
+        """
         is_parsed_query_available = (
             hasattr(self.parent, "restql_nested_parsed_queries")
             and self.field_name in self.parent.restql_nested_parsed_queries
         )
 
         if is_parsed_query_available:
-            parsed_query = self.parent.restql_nested_parsed_queries[self.field_name]
-        else:
-            # Include all fields
-            parsed_query = Query(
-                field_name=None,
-                included_fields=["*"],
-                excluded_fields=[],
-                aliases={},
-                arguments={},
-            )
+            return self.parent.restql_nested_parsed_queries[self.field_name]
+
+        return default_query()
 
-        has_fields = (
+    # noinspection PyMethodMayBeStatic
+    def has_fields(self, parsed_query: Query) -> bool:
+        """
+        Check if the client asks for nested fields, so the resource must be serialized instead of hyperlinked
+        """
+        return bool(
             parsed_query.included_fields
             and "*" not in parsed_query.included_fields
             or parsed_query.excluded_fields
             or parsed_query.aliases
         )
 
+    def contribute_to_plan(self, plan: QueryPlan, field_name: str, parsed_query: Query | None):
+        """
+        Add this field to a query plan, through `relation` (the field name by default), joined or prefetched when it's
+        rendered nested and just its foreign key column when it's rendered as a hyperlink
+        """
+        parsed_query = parsed_query or default_query()
+        nested = None
+        if self.has_fields(parsed_query):
+            nested = build_plan(self.serializer_class, parsed_query)
+            if nested is None:
+                plan.load_all()
+                return
+        plan.add_relation(self.relation or field_name, nested)
+
+    def serialize(self, instance, parsed_query: Query, many: bool):
+        """
+        Serialize the nested instance(s) with the field serializer class
+        """
+        if issubclass(self.serializer_class, DynamicFieldsMixin):
+            return self.serializer_class(
+                instance=instance,
+                context=self.context,
+                parsed_query=parsed_query,
+                many=many,
+            ).data
+        return self.serializer_class(
+            instance=instance,
+            context=self.context,
+            many=many,
+        ).data
+
+    # noinspection PyTypeChecker,PyUnresolvedReferences,PyCallingNonCallable
+    def to_representation(self, value):
+        parsed_query = self.get_parsed_query()
+
+        bulk_representations = self.get_bulk_representations(parsed_query)
+        if bulk_representations is not None and id(value) in bulk_representations:
+            return bulk_representations[id(value)]
+
+        method = getattr(self.parent, self.method_name)
         instance, url_config = method(value, parsed_query)
 
-        if has_fields:
-            if issubclass(self.serializer_class, DynamicFieldsMixin):
-                return self.serializer_class(
-                    instance=instance,
-                    context=self.context,
-                    parsed_query=parsed_query,
-                    many=self.many,
-                ).data
-            else:
-                return self.serializer_class(
-                    instance=instance,
-                    context=self.context,
-                    many=self.many,
-                ).data
+        if self.has_fields(parsed_query):
+            if self.many:
+                instances = list(instance.all() if isinstance(instance, BaseManager) else instance)
+                return self.serialize_cached(instances, parsed_query)
+            if instance is None:
+                return self.serialize(instance, parsed_query, many=False)
+            return self.serialize_cached([instance], parsed_query)[0]
+
+        return self.reverse_urls([url_config])[0]
+
+    # ### Cached serialization
+
+    def get_representation_cache(self) -> RepresentationCache | None:
+        if not self.cache_representations:
+            return None
+        return RepresentationCache.from_context(self.context)
+
+    def get_fingerprint(self, parsed_query: Query) -> tuple:
+        # the parsed query is the same object for every row, so its fingerprint is computed once
+        if self._fingerprint is None or self._fingerprint[0] is not parsed_query:
+            self._fingerprint = (parsed_query, query_fingerprint(parsed_query))
+        return self._fingerprint[1]
+
+    def serialize_cached(self, instances: list, parsed_query: Query) -> list:
+        """
+        Serialize nested instances in a single `many=True` pass, reusing the representations already built
+        for this response
+        """
+        cache = self.get_representation_cache()
+        if cache is None:
+            return list(self.serialize(instances, parsed_query, many=True))
+
+        fingerprint = self.get_fingerprint(parsed_query)
+        keys = [
+            None if getattr(i, "pk", None) is None else (self.serializer_class, type(i), i.pk, fingerprint)
+            for i in instances
+        ]
+        return cache.get_many(
+            keys, lambda missing: self.serialize([instances[p] for p in missing], parsed_query, many=True)
+        )
+
+    def reverse_urls(self, url_configs: list) -> list:
+        """
+        Reverse url configurations in a batch, reusing the urls already reversed for this response
+        """
+        cache = self.get_representation_cache()
+        if cache is None:
+            return [self.reverse_url(c) for c in url_configs]
+
+        return cache.get_many(
+            [_url_key(c) for c in url_configs],
+            lambda missing: [self.reverse_url(url_configs[p]) for p in missing],
+        )
+
+    # ### Bulk resolution
+
+    # Calling `get_<field_name>` once per parent row is an N+1 as soon as the method touches the database. When the
+    # parent serializer is the child of a list serializer (`many=True`) and defines `get_<field_name>_bulk`, the
+    # whole parent page is resolved with one call, the nested instances are serialized in a single `many=True`
+    # pass (or the urls reversed in a batch) and each row just picks its own representation.
+
+    def get_page(self):
+        """
+        Return the parent objects being serialized when the parent serializer is inside a list serializer
+        """
+        list_serializer = getattr(self.parent, "parent", None)
+        if not isinstance(list_serializer, ListSerializer):
+            return None
+        return getattr(list_serializer, "instance", None)
+
+    def get_bulk_representations(self, parsed_query: Query) -> dict | None:
+        """
+        Return the representations of the whole parent page keyed by parent object identity, or `None` if the
+        bulk method is not available
+        """
+        bulk_method = getattr(self.parent, self.bulk_method_name or f"{self.method_name}_bulk", None)
+        page = self.get_page()
+        if bulk_method is None or page is None:
+            return None
+
+        if self._bulk_page is not page:
+            objs = list(page.all() if isinstance(page, BaseManager) else page)
+            results = list(bulk_method(objs, parsed_query))
+            if len(results) != len(objs):
+                raise ImproperlyConfigured(
+                    f"{type(self.parent).__name__}.{bulk_method.__name__} must return one "
+                    f"(instance, URLConfig) tuple per object"
+                )
+            self._bulk_page = page
+            # keep the objects alive, the representations are keyed by their identity
+            self._bulk_objs = objs
+            self._bulk_representations = dict(
+                zip(map(id, objs), self.to_bulk_representation(results, parsed_query))
+            )
+
+        return self._bulk_representations
+
+    def to_bulk_representation(self, results: list, parsed_query: Query) -> list:
+        """
+        Turn the `(instance, URLConfig)` tuples of a page into representations in the same order
+        """
+        if not self.has_fields(parsed_query):
+            return self.reverse_urls([url_config for _, url_config in results])
+
+        if self.many:
+            groups = [list(instances.all() if isinstance(instances, BaseManager) else instances)
+                      for instances, _ in results]
+            data = self.serialize_cached([i for group in groups for i in group], parsed_query)
+            representations, cursor = [], 0
+            for group in groups:
+                representations.append(list(data[cursor:cursor + len(group)]))
+                cursor += len(group)
+            return representations
 
-        return self.reverse_url(url_config)
+        instances = [instance for instance, _ in results if instance is not None]
+        data = iter(self.serialize_cached(instances, parsed_query))
+        return [None if instance is None else next(data) for instance, _ in results]
 
     def reverse_url(self, url_config: URLConfig):
         return reverse(
@@ -0,0 +1,96 @@
+# # Query planner
+
+from django.db.models import QuerySet
+from django_restql.exceptions import QueryFormatError
+from django_restql.mixins import RequestQueryParserMixin
+from django_restql.parser import Query
+from rest_framework.permissions import SAFE_METHODS
+
+from dauto.drf.planner import QueryPlan, build_plan
+from dauto.drf.restql.fields import default_query
+
+# RESTQL lets the client pick which fields and which nested resources are rendered, but the queryset behind the
+# view is built before that choice is known, so it loads every column and hits the database once per row for each
+# nested resource. This planner extends the serializer planner (`dauto.drf.planner`) walking the parsed query
+# alongside the serializer declarations, so only the selected fields are loaded.
+#
+# A `HyperlinkedNestedSerializerMethodField` rendered as a hyperlink only loads the foreign key column it needs.
+
+# ??? note
+#
+# Method fields are opaque to the planner. A `HyperlinkedNestedSerializerMethodField` is planned through its
+# `relation` (the field name by default) and fields we can't map to a column (`SerializerMethodField`, properties,
+# `source="*"`) make the planner load every column of that model. Many relations rendered as hyperlinks are not
+# prefetched, their url is usually built from the parent.
+
+# Plans only depend on the selected fields, aliases and arguments don't change what is loaded. The cache is bounded,
+# clients can send any number of distinct selections.
+
+_plans_cache: dict[tuple, QueryPlan | None] = {}
+_MAX_PLANS = 1024
+_MISSING = object()
+
+
+def _plan_key(parsed_query: Query) -> tuple:
+    """
+    Return the selected and excluded field names of a parsed query, nested queries included
+    """
+    return (
+        frozenset(
+            (field.field_name, _plan_key(field)) if isinstance(field, Query) else field
+            for field in parsed_query.included_fields
+        ),
+        frozenset(parsed_query.excluded_fields),
+    )
+
+
+def plan(queryset: QuerySet, serializer, parsed_query: Query | None = None) -> QuerySet:
+    """
+    Apply to a queryset the plan of a serializer for a parsed query. Plans are cached per serializer class and
+    selected fields.
+
+    Parameters:
+        queryset: The queryset to plan
+        serializer: The serializer class rendering the queryset
+        parsed_query: The RESTQL parsed query, all fields by default
+
+    Returns:
+        QuerySet: The planned queryset
+    """
+    parsed_query = parsed_query or default_query()
+    klass = serializer if isinstance(serializer, type) else type(serializer)
+    key = (klass, _plan_key(parsed_query))
+    query_plan = _plans_cache.get(key, _MISSING)
+    if query_plan is _MISSING:
+        query_plan = build_plan(serializer, parsed_query)
+        if len(_plans_cache) >= _MAX_PLANS:
+            _plans_cache.clear()
+        _plans_cache[key] = query_plan
+    if query_plan is None or query_plan.model is not queryset.model:
+        return queryset
+    return query_plan.apply(queryset)
+
+
+# Then a viewset mixin plan the queryset of every read request with the query sent by the client
+
+# noinspection PyUnresolvedReferences
+class QueryPlannerMixin(RequestQueryParserMixin):
+    """
+    Viewset mixin that applies `select_related`, `prefetch_related` and `only()`/`defer()` to the queryset of read
+    requests according to the serializer class and the RESTQL query sent by the client.
+    """
+
+    def get_parsed_restql_query(self) -> Query | None:
+        if not self.has_restql_query_param(self.request):
+            return None
+        try:
+            return self.get_parsed_restql_query_from_req(self.request)
+        except (SyntaxError, QueryFormatError):
+            # Let `DynamicFieldsMixin` handle this to get a helpful error message
+            return None
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.request.method not in SAFE_METHODS:
+            return queryset
+        return plan(queryset, self.get_serializer_class(), self.get_parsed_restql_query())
@@ -1,6 +1,12 @@
+import re
+import typing
 from dataclasses import dataclass
 from urllib.parse import urlencode
+
+from django.core.signals import setting_changed
+from django.urls import get_script_prefix, get_urlconf
 from rest_framework.reverse import reverse as drf_reverse
+from rest_framework.settings import api_settings
 
 # DRF `reverse` method does not provide a built-in way to generate URLs with query parameters.
 # This utility function addresses that limitation by accepting a dictionary of query parameters
@@ -24,10 +30,7 @@ def reverse(
     :return: The generated URL with query string
     """
 
-    base_url = drf_reverse(view_name, request=request, urlconf=urlconf, kwargs=kwargs)
-    if query_kwargs:
-        return "{}?{}".format(base_url, urlencode(query_kwargs))
-    return base_url
+    return ReverseEngine.for_request(request, urlconf).reverse(view_name, kwargs, query_kwargs)
 
 # E.g: Given the viewset PersonViewSet that manages people gen a URL to filter only cubans
 # That is when the function becomes handy
@@ -49,4 +52,180 @@ class URLConfig:
 
     view_name: str
     path_params: dict[str, str] | None = None
-    query_params: dict[str, str] | None = None
\ No newline at end of file
+    query_params: dict[str, str] | None = None
+
+# ## Compiled reverse
+
+# Reversing the same view over and over (once per row and per hyperlinked field on a list endpoint) walks the
+# Django resolver, the versioning scheme, `build_absolute_uri` and `urlencode` every single time. Nothing in that
+# chain changes between rows except the path params, so the `ReverseEngine` reverses a view the slow way once,
+# splits the resulting absolute URL around the path param values and keeps it as a template. Next calls just join
+# strings.
+
+# ??? note
+#
+# A template is keyed by the view, the request context (host, script prefix, urlconf, version, format override)
+# and the *shape* of each path param value: its kind (digits, hex or slug) and its length. Values with other
+# characters are never templated and always take the slow path. We assume that two values of the same shape are
+# both accepted by the url converter, which holds for the builtin `int`, `str`, `slug`, `uuid` and `path`
+# converters but may not for custom regex patterns constrained by value (e.g. `0[1-9]|1[0-2]`).
+
+_SAFE_VALUE = re.compile(r"[A-Za-z0-9_~.-]+")
+_HEX_CHARS = frozenset("0123456789abcdefABCDEF-")
+
+_templates: dict[tuple, tuple[str, ...] | None] = {}
+_MAX_TEMPLATES = 4096
+
+
+def _shape(value) -> tuple[str, int] | None:
+    text = str(value)
+    if not _SAFE_VALUE.fullmatch(text):
+        return None
+    if text.isdigit():
+        return "int", len(text)
+    if _HEX_CHARS.issuperset(text):
+        return "hex", len(text)
+    return "slug", len(text)
+
+
+def _compile(url: str, kwargs: dict) -> tuple[str, ...] | None:
+    """
+    Split an already reversed url around the path params values. Odd positions of the result hold param names.
+    Return `None` when some value does not appear exactly once in the url.
+    """
+    slots = []
+    for name, value in kwargs.items():
+        text = str(value)
+        position = url.find(text)
+        if position < 0 or url.find(text, position + 1) >= 0:
+            return None
+        slots.append((position, position + len(text), name))
+    slots.sort()
+
+    parts, cursor = [], 0
+    for start, end, name in slots:
+        if start < cursor:
+            return None
+        parts.extend((url[cursor:start], name))
+        cursor = end
+    parts.append(url[cursor:])
+    return tuple(parts)
+
+
+def clear_reverse_cache():
+    """
+    Drop every compiled url template
+    """
+    _templates.clear()
+
+
+# noinspection PyUnusedLocal
+def _on_setting_changed(setting, **kwargs):
+    if setting in ("ROOT_URLCONF", "REST_FRAMEWORK"):
+        clear_reverse_cache()
+
+
+setting_changed.connect(_on_setting_changed)
+
+
+class ReverseEngine:
+    """
+    Reverse urls through cached templates. Build it with `ReverseEngine.for_request` to share it across every
+    reverse made with the same request.
+    """
+
+    def __init__(self, request=None, urlconf=None):
+        """
+        Parameters:
+            request: The request object (optional). If given urls are absolute.
+            urlconf: The URL configuration (optional)
+        """
+        self.request = request
+        self.urlconf = urlconf
+        self._host = None
+
+    @classmethod
+    def for_request(cls, request=None, urlconf=None) -> "ReverseEngine":
+        """
+        Return the engine attached to the request, creating it on first use.
+        """
+        if request is None:
+            return cls(urlconf=urlconf)
+        engine = getattr(request, "_dauto_reverse_engine", None)
+        if engine is None or engine.urlconf != urlconf:
+            engine = cls(request, urlconf)
+            request._dauto_reverse_engine = engine
+        return engine
+
+    def _context(self) -> tuple:
+        request = self.request
+        if request is None:
+            return self.urlconf, get_urlconf(), get_script_prefix()
+
+        if self._host is None:
+            self._host = request.build_absolute_uri("/")
+        format_override = api_settings.URL_FORMAT_OVERRIDE
+        return (
+            self.urlconf,
+            get_urlconf(),
+            get_script_prefix(),
+            self._host,
+            getattr(request, "version", None),
+            type(getattr(request, "versioning_scheme", None)),
+            request.GET.get(format_override) if format_override else None,
+        )
+
+    def reverse(self, view_name, kwargs=None, query_kwargs=None) -> str:
+        """
+        Generate a URL with a query string.
+
+        :param view_name: The name of the view
+        :param kwargs: Dictionary of view (path) arguments (optional)
+        :param query_kwargs: Dictionary of query parameters (optional)
+        :return: The generated URL with query string
+        """
+        kwargs = kwargs or {}
+        shapes = [(name, _shape(value)) for name, value in kwargs.items()]
+
+        if any(shape is None for _, shape in shapes):
+            url = self._slow_reverse(view_name, kwargs)
+        else:
+            key = (view_name, self._context(), tuple(sorted(shapes)))
+            template = _templates.get(key)
+            if template is None:
+                url = self._slow_reverse(view_name, kwargs)
+                template = _compile(url, kwargs)
+                if template is not None:
+                    if len(_templates) >= _MAX_TEMPLATES:
+                        _templates.clear()
+                    _templates[key] = template
+            else:
+                url = "".join(str(kwargs[part]) if i % 2 else part for i, part in enumerate(template))
+
+        if query_kwargs:
+            return "{}{}{}".format(url, "&" if "?" in url else "?", urlencode(query_kwargs))
+        return url
+
+    def reverse_many(self, configs: typing.Iterable[URLConfig]) -> list[str]:
+        """
+        Reverse a batch of url configurations at once.
+
+        :param configs: The url configurations
+        :return: The generated URLs in the same order
+        """
+        return [self.reverse(c.view_name, c.path_params, c.query_params) for c in configs]
+
+    def _slow_reverse(self, view_name, kwargs) -> str:
+        return drf_reverse(view_name, request=self.request, urlconf=self.urlconf, kwargs=kwargs or None)
+
+
+def reverse_many(configs: typing.Iterable[URLConfig], request=None, urlconf=None) -> list[str]:
+    """
+    Generate the URLs of a batch of url configurations.
+
+    :param configs: Iterable of `URLConfig`
+    :param request: The request object (optional)
+    :param urlconf: The URL configuration (optional)
+    :return: The generated URLs in the same order
+    """
+    return ReverseEngine.for_request(request, urlconf).reverse_many(configs)
@@ -1,4 +1,7 @@
+import copy
 import typing
+from types import MappingProxyType
+
 from rest_framework import serializers
 
 # Some times we want to sort the fields of a serializer alphabetically to make it easier to read
@@ -10,6 +13,37 @@ class AlphaSortedFieldsSerializer(serializers.Serializer):
 
     sorted_first_fields: typing.Iterable[str] = ("url", "id")
 
+    # The sorted key order only depends on the keys of the representation, which are the same for every instance
+    # serialized with the same fields (and RESTQL field selection). We compute that order once and keep it as a
+    # plan, so each representation is emitted with a single dict construction. Aliased RESTQL queries bring any key
+    # set, so once the plans are full new orders are computed without being kept.
+
+    _ordering_plans: typing.ClassVar[typing.Dict[tuple, tuple]] = {}
+    _max_ordering_plans: typing.ClassVar[int] = 1024
+
+    @classmethod
+    def get_ordering_plan(cls, keys: typing.Tuple[str, ...]) -> typing.Tuple[str, ...]:
+        """
+        Return the sorted order of a representation keys, cached per serializer class and key set.
+
+        :param keys: representation keys in their original order
+        :return: sorted keys
+        """
+        cache_key = (cls, keys)
+        plan = cls._ordering_plans.get(cache_key)
+        if plan is None:
+            first_fields = [field for field in cls.sorted_first_fields if field in keys]
+            meta_fields = [field for field in keys if field.startswith("_") or field == "meta"]
+            skipped = {*first_fields, *meta_fields}
+            plan = (
+                *first_fields,
+                *sorted(field for field in keys if field not in skipped),
+                *meta_fields,
+            )
+            if len(cls._ordering_plans) < cls._max_ordering_plans:
+                cls._ordering_plans[cache_key] = plan
+        return plan
+
     def sort_fields(self, representation: typing.Dict[str, typing.Any]) -> dict:
         """
         Sort representation keys alphabetically.
@@ -20,33 +54,49 @@ class AlphaSortedFieldsSerializer(serializers.Serializer):
         :param representation: default
         :return: sorted dict
         """
+        return {field: representation[field] for field in self.get_ordering_plan(tuple(representation))}
 
-        # Sort the fields alphabetically by key
-        sorted_representation = OrderedDict(sorted(representation.items()))
+    def to_representation(self, instance):
+        return self.sort_fields(super().to_representation(instance))
 
-        # Extract sorted fists fields
-        sorted_first_dict = {
-            field: sorted_representation.pop(field)
-            for field in self.sorted_first_fields
-            if field in sorted_representation
-        }
 
-        # Extract meta fields
-        meta_fields_dict = {
-            field: sorted_representation.get(field)
-            for field in representation
-            if field.startswith("_") or field == "meta"
-        }
+# Every serializer instance builds its fields again, deep copying the declared ones and, for model serializers,
+# introspecting the model. Read serializers are built per request (and per row by nested method fields) with the very
+# same fields, so the `FieldsTemplateMixin` builds them once per serializer class and keeps them as a read-only
+# template. Each instance gets shallow copies of the template fields, only the fields holding other fields (nested
+# serializers, many related fields, list fields, ...) are deep copied because they are bound to their children.
 
-        if sorted_first_dict:
-            sorted_representation = {**sorted_first_dict, **sorted_representation}
+# ??? warning
+#
+# Don't use it in serializers whose `get_fields` depends on the instance, the context or the request.
 
-        if meta_fields_dict:
-            for field in meta_fields_dict:
-                sorted_representation.pop(field)
-            sorted_representation = {**sorted_representation, **meta_fields_dict}
+class FieldsTemplateMixin:
+    """
+    Serializer mixin building the fields once per serializer class and copying them from that template
+    """
 
-        return sorted_representation
+    _fields_templates: typing.ClassVar[typing.Dict[type, typing.Mapping[str, serializers.Field]]] = {}
 
-    def to_representation(self, instance):
-        return self.sort_fields(super().to_representation(instance))
\ No newline at end of file
+    @classmethod
+    def get_fields_template(cls, serializer) -> typing.Mapping[str, serializers.Field]:
+        """
+        Return the read-only fields template of the serializer class, built from `serializer` the first time
+        """
+        template = cls._fields_templates.get(cls)
+        if template is None:
+            template = cls._fields_templates[cls] = MappingProxyType(super(FieldsTemplateMixin, serializer).get_fields())
+        return template
+
+    def get_fields(self):
+        return {
+            name: copy.deepcopy(field) if _has_children(field) else copy.copy(field)
+            for name, field in self.get_fields_template(self).items()
+        }
+
+
+def _has_children(field: serializers.Field) -> bool:
+    return (
+        isinstance(field, serializers.BaseSerializer)
+        or hasattr(field, "child")
+        or hasattr(field, "child_relation")
+    )
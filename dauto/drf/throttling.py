@@ -1,3 +1,8 @@
+import math
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+
 from django.core.exceptions import ImproperlyConfigured
 from rest_framework.throttling import SimpleRateThrottle
 
@@ -26,16 +31,189 @@ class ByOperationThrottle(SimpleRateThrottle):
 
     class ByOperationAnonRateThrottle(ByOperationThrottle, AnonRateThrottle):
         pass
+
+    The `algorithm` attribute selects how requests are counted:
+
+    - `history` (default): DRF timestamps history, a list of timestamps per key rewritten on every request.
+    - `sliding-window`: two fixed window counters per key weighted by the elapsed part of the current window,
+      updated with atomic `incr`/`add`. Constant size state, approximates the history by assuming the previous
+      window requests were evenly distributed.
+    - `gcra`: generic cell rate algorithm, a single theoretical arrival time per key. Constant size state, exact
+      spacing of requests with bursts up to the whole rate. Read and written with `get`/`set` as the history is.
+
+    - `leased`: the sliding window counters behind a local (per worker process) token bucket. Each worker leases
+      `local_lease_size` tokens of the shared quota at once and spends them without touching the cache, going back
+      to it when the lease is spent or every `local_sync_interval` seconds to renew the lease and give back unused
+      tokens. A lease is only granted with room left in the shared quota, so the overshoot is bounded by the
+      tokens leased and not yet spent: at most `workers * local_lease_size` requests, counted up to
+      `local_sync_interval` seconds late. Leased and unspent tokens of idle workers are counted as used until the
+      lease is renewed or the window ends, so under contention a worker may throttle a bit early.
+
+    class ByOperationUserRateThrottle(ByOperationThrottle, UserRateThrottle):
+        algorithm = "sliding-window"
     """
 
     scope = "by-operation"  # default scope
     rate = "50/m"  # default rate limit
+    algorithm = "history"
+
+    HISTORY = "history"
+    SLIDING_WINDOW = "sliding-window"
+    GCRA = "gcra"
+    LEASED = "leased"
+
+    local_lease_size: int | None = None  # tokens per lease, by default 5% of the rate
+    local_sync_interval: float = 1.0  # seconds a lease lives before going back to the shared cache
+
+    # leases of the worker, least recently renewed first and bounded, evicting a lease only forgets its unspent tokens
+    _leases: OrderedDict[str, "_Lease"] = OrderedDict()
+    _leases_lock = threading.Lock()
+    _max_leases = 10_000
 
     def allow_request(self, request, view):
         # Override init scope and rate before checking for request
         self._override_scope(request, view)
         self._override_rate(request, view)
-        return super().allow_request(request, view)
+        if self.algorithm == self.HISTORY:
+            return super().allow_request(request, view)
+
+        if self.rate is None:
+            return True
+
+        self.key = self.get_cache_key(request, view)
+        if self.key is None:
+            return True
+
+        self.now = self.timer()
+        if self.algorithm == self.SLIDING_WINDOW:
+            return self._allow_sliding_window()
+        if self.algorithm == self.GCRA:
+            return self._allow_gcra()
+        if self.algorithm == self.LEASED:
+            return self._allow_leased()
+        raise ImproperlyConfigured(
+            f"Unknown throttle algorithm '{self.algorithm}' in {self.__class__.__name__}"
+        )
+
+    def wait(self):
+        if self.algorithm == self.HISTORY:
+            return super().wait()
+        return getattr(self, "_wait", None)
+
+    # Sliding window counter
+
+    def _window_keys(self) -> tuple[str, str, float]:
+        window = int(self.now // self.duration)
+        elapsed = self.now - window * self.duration
+        return f"{self.key}:{window - 1}", f"{self.key}:{window}", elapsed
+
+    def _estimate(self, previous: int, current: int, elapsed: float) -> float:
+        return previous * (self.duration - elapsed) / self.duration + current
+
+    def _sliding_window_wait(self, previous: int, current: int, elapsed: float) -> float:
+        """
+        Seconds until one more request fits, `current` does not count the rejected request
+        """
+        if current + 1 <= self.num_requests and previous:
+            wait = (self.duration - elapsed) - self.duration * (self.num_requests - current - 1) / previous
+        else:
+            # it only fits in the next window, where the current window becomes the previous one
+            wait = (self.duration - elapsed) + max(
+                0.0, self.duration - self.duration * (self.num_requests - 1) / max(current, 1)
+            )
+        return max(wait, 0.0)
+
+    def _incr(self, key: str, timeout: int, delta: int = 1) -> int:
+        try:
+            return self.cache.incr(key, delta)
+        except ValueError:
+            if self.cache.add(key, delta, timeout):
+                return delta
+            return self.cache.incr(key, delta)
+
+    def _allow_sliding_window(self) -> bool:
+        previous_key, current_key, elapsed = self._window_keys()
+        previous = self.cache.get(previous_key, 0)
+        current = self._incr(current_key, 2 * self.duration)
+
+        if self._estimate(previous, current, elapsed) > self.num_requests:
+            try:
+                self.cache.decr(current_key)
+            except ValueError:
+                pass
+            self._wait = self._sliding_window_wait(previous, current - 1, elapsed)
+            return False
+
+        self._wait = None
+        return True
+
+    # Local leases
+
+    def _allow_leased(self) -> bool:
+        window = int(self.now // self.duration)
+        with self._leases_lock:
+            lease = self._leases.get(self.key)
+            if lease is not None and lease.window == window and lease.expires > self.now and lease.tokens > 0:
+                lease.tokens -= 1
+                self._wait = None
+                return True
+
+        previous_key, current_key, elapsed = self._window_keys()
+        current_lease = lease is not None and lease.window == window
+        unused = lease.tokens if current_lease else 0
+        previous = lease.previous if current_lease else self.cache.get(previous_key, 0)
+
+        # take a whole lease (our unused tokens are already counted) and give back what does not fit
+        size = self.local_lease_size or max(1, self.num_requests // 20)
+        if size != unused:
+            total = self._incr(current_key, 2 * self.duration, size - unused)
+        else:
+            total = self.cache.get(current_key, size)
+        available = math.floor(self.num_requests - self._estimate(previous, total - size, elapsed))
+        granted = min(max(available, 0), size)
+        if granted < size:
+            try:
+                self.cache.decr(current_key, size - granted)
+            except ValueError:
+                pass
+
+        with self._leases_lock:
+            self._leases.pop(self.key, None)
+            self._leases[self.key] = _Lease(
+                window=window,
+                tokens=max(granted - 1, 0),
+                expires=self.now + self.local_sync_interval,
+                previous=previous,
+            )
+            while len(self._leases) > self._max_leases:
+                self._leases.popitem(last=False)
+
+        if granted == 0:
+            self._wait = self._sliding_window_wait(previous, total - size, elapsed)
+            return False
+        self._wait = None
+        return True
+
+    # Generic cell rate algorithm
+
+    def _gcra(self, tat: float | None) -> float | None:
+        """
+        Return the new theoretical arrival time if the request is allowed, otherwise `None` (setting the wait)
+        """
+        interval = self.duration / self.num_requests
+        new_tat = max(tat or self.now, self.now) + interval
+        if new_tat - self.now > self.duration:
+            self._wait = new_tat - self.duration - self.now
+            return None
+        self._wait = None
+        return new_tat
+
+    def _allow_gcra(self) -> bool:
+        new_tat = self._gcra(self.cache.get(self.key))
+        if new_tat is None:
+            return False
+        self.cache.set(self.key, new_tat, math.ceil(new_tat - self.now))
+        return True
 
     def _override_scope(self, request, view):
         self.scope = self._get_scope(request, view)
@@ -76,4 +254,157 @@ class ByOperationThrottle(SimpleRateThrottle):
                 f"Missing throttle_scopes attribute in view {view.__class__.__name__}"
             )
 
-        return getattr(view, "throttle_scopes", {})
\ No newline at end of file
+        return getattr(view, "throttle_scopes", {})
+
+
+class ThrottleEvaluator:
+    """
+    Evaluate several throttles with a single cache read and a single cache write.
+
+    DRF checks every throttle of a view on its own, each one with its own `cache.get` and `cache.set`. The evaluator
+    gathers the cache keys of every `SimpleRateThrottle` (including `ByOperationThrottle` with the `history`,
+    `sliding-window` or `gcra` algorithms) sharing the same cache, fetches them with one `get_many`, takes every
+    decision and writes back with one `set_many`, using the longest timeout of the written values. Throttles that
+    can't be batched (other classes, other caches or the `leased` algorithm) are checked as usual.
+
+    As the history algorithm itself, batched decisions are read-modify-write and not atomic, so the
+    `sliding-window` counters lose their `incr` atomicity when evaluated in a batch.
+    """
+
+    BATCHABLE = (ByOperationThrottle.HISTORY, ByOperationThrottle.SLIDING_WINDOW, ByOperationThrottle.GCRA)
+
+    def __init__(self, throttles):
+        self.throttles = list(throttles)
+
+    def evaluate(self, request, view) -> list[float | None]:
+        """
+        Check every throttle against the request
+
+        Parameters:
+            request: The request
+            view: The view handling the request
+
+        Returns:
+            list: The wait of each throttle that rejected the request, empty if it is allowed
+        """
+        waits, batch, cache = [], [], None
+        for throttle in self.throttles:
+            if self._is_batchable(throttle, cache):
+                cache = throttle.cache
+                if self._prepare(throttle, request, view):
+                    batch.append(throttle)
+            elif not throttle.allow_request(request, view):
+                waits.append(throttle.wait())
+
+        if not batch:
+            return waits
+
+        values = cache.get_many([key for throttle in batch for key in self._keys(throttle)])
+        writes, timeout = {}, 0
+        for throttle in batch:
+            allowed, throttle_writes, throttle_timeout = self._decide(throttle, values)
+            if not allowed:
+                waits.append(throttle.wait())
+            writes.update(throttle_writes)
+            timeout = max(timeout, throttle_timeout)
+
+        if writes:
+            cache.set_many(writes, timeout)
+        return waits
+
+    def _is_batchable(self, throttle, cache) -> bool:
+        klass = type(throttle)
+        return (
+            isinstance(throttle, SimpleRateThrottle)
+            and klass.allow_request in (SimpleRateThrottle.allow_request, ByOperationThrottle.allow_request)
+            and klass.throttle_success is SimpleRateThrottle.throttle_success
+            and klass.throttle_failure is SimpleRateThrottle.throttle_failure
+            and getattr(throttle, "algorithm", ByOperationThrottle.HISTORY) in self.BATCHABLE
+            and (cache is None or throttle.cache is cache)
+        )
+
+    # noinspection PyProtectedMember
+    @staticmethod
+    def _prepare(throttle, request, view) -> bool:
+        """
+        Resolve scope, rate, key and time of a throttle. Return `False` if the request is not throttled by it.
+        """
+        if isinstance(throttle, ByOperationThrottle):
+            throttle._override_scope(request, view)
+            throttle._override_rate(request, view)
+        if throttle.rate is None:
+            return False
+        throttle.key = throttle.get_cache_key(request, view)
+        if throttle.key is None:
+            return False
+        throttle.now = throttle.timer()
+        return True
+
+    # noinspection PyProtectedMember
+    @staticmethod
+    def _keys(throttle) -> list[str]:
+        if getattr(throttle, "algorithm", None) == ByOperationThrottle.SLIDING_WINDOW:
+            previous_key, current_key, _ = throttle._window_keys()
+            return [previous_key, current_key]
+        return [throttle.key]
+
+    # noinspection PyProtectedMember
+    @staticmethod
+    def _decide(throttle, values: dict) -> tuple[bool, dict, int]:
+        """
+        Take the decision of a throttle from the fetched values, return it with the values to write and their timeout
+        """
+        algorithm = getattr(throttle, "algorithm", ByOperationThrottle.HISTORY)
+
+        if algorithm == ByOperationThrottle.SLIDING_WINDOW:
+            previous_key, current_key, elapsed = throttle._window_keys()
+            previous = values.get(previous_key, 0)
+            current = values.get(current_key, 0)
+            if throttle._estimate(previous, current + 1, elapsed) > throttle.num_requests:
+                throttle._wait = throttle._sliding_window_wait(previous, current, elapsed)
+                return False, {}, 0
+            throttle._wait = None
+            return True, {current_key: current + 1}, 2 * throttle.duration
+
+        if algorithm == ByOperationThrottle.GCRA:
+            new_tat = throttle._gcra(values.get(throttle.key))
+            if new_tat is None:
+                return False, {}, 0
+            return True, {throttle.key: new_tat}, math.ceil(new_tat - throttle.now)
+
+        throttle.history = values.get(throttle.key, [])
+        while throttle.history and throttle.history[-1] <= throttle.now - throttle.duration:
+            throttle.history.pop()
+        if len(throttle.history) >= throttle.num_requests:
+            return False, {}, 0
+        throttle.history.insert(0, throttle.now)
+        return True, {throttle.key: throttle.history}, throttle.duration
+
+
+class BatchedThrottlesMixin:
+    """
+    View mixin that checks every throttle of the view through a `ThrottleEvaluator`, turning a cache round trip
+    pair per throttle into one `get_many` and one `set_many`.
+
+    class AViewSet(BatchedThrottlesMixin, ModelViewSet):
+        throttle_classes = [ByOperationUserRateThrottle, UserRateThrottle, AnonRateThrottle]
+    """
+
+    # noinspection PyUnresolvedReferences
+    def check_throttles(self, request):
+        waits = ThrottleEvaluator(self.get_throttles()).evaluate(request, self)
+        if waits:
+            durations = [wait for wait in waits if wait is not None]
+            self.throttled(request, max(durations, default=None))
+
+
+@dataclass
+class _Lease:
+    """
+    Tokens of the shared quota leased by this process for a throttle key
+    """
+
+    window: int
+    tokens: int
+    expires: float
+    previous: int
@@ -1,8 +1,28 @@
 # # Mixins
 
+import hashlib
+import threading
+import time
+from datetime import datetime
+from itertools import islice
+
+from django.apps import apps
+from django.core.cache import cache as default_cache
+from django.core.exceptions import FieldDoesNotExist, ValidationError as DjangoValidationError
+from django.db import router, transaction
+from django.db.models import Count, ManyToManyField, Max, Sum, signals
+from django.http import HttpResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
 from rest_framework import mixins, status, viewsets
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework.renderers import JSONRenderer
 from rest_framework.response import Response
 
+from dauto.drf.planner import plan
+from dauto.signals import batch
+
 
 # Django use mixins as a sort of dependency injection or inversion of control. This file
 # contain a set of these dependencies implementations beforehand.
@@ -13,20 +33,72 @@ from rest_framework.response import Response
 # The serializer mixins can 'inject' new ways to get serializers from classes, can be combined between them.
 # They are self documented
 
+# The serializer class only depends on the viewset class, the action, the kind of operation (read or write) and the
+# request version, so the mixins resolve it once per combination and keep it in `_resolved_serializers`. Set
+# `cache_serializer_classes = False` if your `serializer_class` changes at runtime. The version may come straight
+# from the client (e.g. `AcceptHeaderVersioning` without `ALLOWED_VERSIONS`), so versions without a serializer are
+# not kept and the cache is bounded.
+
+_resolved_serializers: dict[tuple, type] = {}
+_MAX_SERIALIZERS = 1024
+
+READ_METHODS = ("GET", "HEAD", "OPTIONS")
+
+
+def _is_read_operation(viewset) -> bool:
+    """
+    Check if the serializer is resolved for a read operation, the verbose mixins ask for it regardless of the method
+    """
+    read = getattr(viewset, "_read_operation", None)
+    if read is not None:
+        return read
+    return viewset.request.method in READ_METHODS
+
+
+def _remember_serializer(key: tuple, serializer_class):
+    if serializer_class is None:
+        return
+    if len(_resolved_serializers) >= _MAX_SERIALIZERS:
+        _resolved_serializers.clear()
+    _resolved_serializers[key] = serializer_class
+
+
+def _serializer_key(viewset, mixin: str) -> tuple:
+    return (
+        type(viewset),
+        mixin,
+        getattr(viewset, "action", None),
+        _is_read_operation(viewset),
+        getattr(viewset.request, "version", None),
+    )
+
+
 class ByOperationSerializerMixin:
     """
     This class is responsible for determining the appropriate serializer class based on the HTTP request method
     and the action being performed. It extends the GenericViewSet class.
     """
 
+    cache_serializer_classes = True
+
     # noinspection PyUnresolvedReferences
     def get_serializer_class(self: viewsets.GenericViewSet):
+        key = _serializer_key(self, "operation")
+        if self.cache_serializer_classes and key in _resolved_serializers:
+            return _resolved_serializers[key]
+
         old: dict = super().get_serializer_class()
-        if hasattr(self, "action") and self.action in old:
-            return old.get(self.action)
-        elif self.request.method in ["GET", "HEAD", "OPTIONS"]:
-            return old.get("read")
-        return old.get("write")
+        action = getattr(self, "action", None)
+        if action in old:
+            serializer_class = old.get(action)
+        elif _is_read_operation(self):
+            serializer_class = old.get("read")
+        else:
+            serializer_class = old.get("write")
+
+        if self.cache_serializer_classes:
+            _remember_serializer(key, serializer_class)
+        return serializer_class
 
 
 class ByVersionSerializerMixin:
@@ -34,10 +106,21 @@ class ByVersionSerializerMixin:
     This class is responsible for determining the appropriate serializer class based on the request version.
     """
 
+    cache_serializer_classes = True
+
     # noinspection PyUnresolvedReferences
     def get_serializer_class(self):
+        # the action and the operation are part of the key, other serializer getters may come after this one
+        key = _serializer_key(self, "version")
+        if self.cache_serializer_classes and key in _resolved_serializers:
+            return _resolved_serializers[key]
+
         old: dict = super().get_serializer_class()
-        return old.get(self.request.version)
+        serializer_class = old.get(self.request.version)
+
+        if self.cache_serializer_classes:
+            _remember_serializer(key, serializer_class)
+        return serializer_class
 
 
 # ## Verbose mixins
@@ -46,36 +129,111 @@ class ByVersionSerializerMixin:
 # when we use DRF. The verbose mixins classes
 # can do it using a read serializer to map the target instance into the desired format.
 
+# Bulk creation takes a list payload when `allow_bulk_create` is set. The items are validated at once, saved with
+# `bulk_create` in batches of `bulk_create_batch_size` inside a transaction, re-fetched in a single query (with the
+# eager loading planned from the read serializer, see `dauto.drf.planner`) and rendered in a single read pass.
+
+# ??? note
+#
+# `bulk_create` skips `save()`, the model signals and the serializer `create()`. Many to many values are set after the
+# insert, any other custom creation logic belongs to an override of `perform_bulk_create`. Models with multi table
+# inheritance can't be bulk created, they fall back to the serializer `create()` of every item.
+
+def _refetch(viewset, instances) -> list:
+    """
+    Return many written instances re-fetched in one query, keeping their order
+    """
+    # the rows are already committed, so the columns are not restricted: the viewset queryset could clash with the
+    # plan and a failure here would make the client retry a write that succeeded
+    pks = [instance.pk for instance in instances]
+    queryset = plan(viewset.get_queryset(), viewset.get_read_serializer_class(), columns=False)
+    objects = queryset.in_bulk(pks)
+    return [objects.get(pk, instance) for pk, instance in zip(pks, instances)]
+
+
 # noinspection PyUnresolvedReferences
 class CreateVerboseModelMixin(mixins.CreateModelMixin):
     """This class is a mixin that extends the functionality of the CreateModelMixin class. It provides additional
     methods for handling the creation of objects with verbose output."""
 
+    allow_bulk_create = False
+    bulk_create_batch_size = 500
+
     # noinspection PyMethodMayBeStatic
     def get_read_object(self, instance):
         return instance
 
+    def get_read_objects(self, instances):
+        """
+        Return the read objects of many instances re-fetched in one query, keeping their order
+        """
+        return [self.get_read_object(instance) for instance in _refetch(self, instances)]
+
+    def get_read_serializer_class(self):
+        """
+        Return the serializer class used to render the output, the one obtained in a read method
+        """
+        if isinstance(self, ByOperationSerializerMixin):
+            # resolve through the whole getters chain without touching the request
+            self._read_operation = True
+            try:
+                return self.get_serializer_class()
+            finally:
+                self._read_operation = None
+        method = self.request.method
+        self.request.method = "GET"
+        try:
+            return self.get_serializer_class()
+        finally:
+            self.request.method = method
+
     def get_read_serializer(self, *args, **kwargs):
         """
         Return the serializer instance that should be used for validating and
         deserializing input, and for serializing output.
         """
-        method = self.request.method
-        self.request.method = "GET"
-        serializer_class = self.get_serializer_class()
-        self.request.method = method
+        serializer_class = self.get_read_serializer_class()
         kwargs.setdefault("context", self.get_serializer_context())
         return serializer_class(*args, **kwargs)
 
     def create(self, request, *args, **kwargs):
+        if self.allow_bulk_create and isinstance(request.data, list):
+            return self.bulk_create(request, *args, **kwargs)
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
         self.perform_create(serializer)
-        headers = self.get_success_headers(serializer.data)
         read_serializer = self.get_read_serializer(self.get_read_object(serializer.instance))
-        return Response(
-            read_serializer.data, status=status.HTTP_201_CREATED, headers=headers
-        )
+        data = read_serializer.data
+        headers = {**self.get_success_headers(data), **_validator_headers(self, serializer.instance)}
+        return Response(data, status=status.HTTP_201_CREATED, headers=headers)
+
+    def bulk_create(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data, many=True)
+        serializer.is_valid(raise_exception=True)
+        instances = self.perform_bulk_create(serializer)
+        read_serializer = self.get_read_serializer(self.get_read_objects(instances), many=True)
+        return Response(read_serializer.data, status=status.HTTP_201_CREATED)
+
+    def perform_bulk_create(self, serializer):
+        """
+        Save the items of a validated `many=True` serializer and return the created instances
+        """
+        model = serializer.child.Meta.model
+        with transaction.atomic(using=router.db_for_write(model)):
+            if model._meta.parents:
+                return serializer.save()
+
+            many = {f.name for f in model._meta.get_fields() if isinstance(f, ManyToManyField)}
+            instances, relations = [], []
+            for attrs in serializer.validated_data:
+                relations.append({name: attrs.pop(name) for name in many if name in attrs})
+                instances.append(model(**attrs))
+            model._default_manager.bulk_create(instances, batch_size=self.bulk_create_batch_size)
+            for instance, values in zip(instances, relations):
+                for name, value in values.items():
+                    getattr(instance, name).set(value)
+        serializer.instance = instances
+        return instances
 
 
 # noinspection PyUnresolvedReferences
@@ -88,15 +246,36 @@ class UpdateVerboseModelMixin(mixins.UpdateModelMixin):
     def get_read_object(self, instance):
         return instance
 
+    def get_read_objects(self, instances):
+        """
+        Return the read objects of many instances re-fetched in one query, keeping their order
+        """
+        return [self.get_read_object(instance) for instance in _refetch(self, instances)]
+
+    def get_read_serializer_class(self):
+        """
+        Return the serializer class used to render the output, the one obtained in a read method
+        """
+        if isinstance(self, ByOperationSerializerMixin):
+            # resolve through the whole getters chain without touching the request
+            self._read_operation = True
+            try:
+                return self.get_serializer_class()
+            finally:
+                self._read_operation = None
+        method = self.request.method
+        self.request.method = "GET"
+        try:
+            return self.get_serializer_class()
+        finally:
+            self.request.method = method
+
     def get_read_serializer(self, *args, **kwargs):
         """
         Return the serializer instance that should be used for validating and
         deserializing input, and for serializing output.
         """
-        method = self.request.method
-        self.request.method = "GET"
-        serializer_class = self.get_serializer_class()
-        self.request.method = method
+        serializer_class = self.get_read_serializer_class()
         kwargs.setdefault("context", self.get_serializer_context())
         return serializer_class(*args, **kwargs)
 
@@ -111,4 +290,526 @@ class UpdateVerboseModelMixin(mixins.UpdateModelMixin):
             # forcibly invalidate the prefetch cache on the instance.
             instance._prefetched_objects_cache = {}
         read_serializer = self.get_read_serializer(self.get_read_object(serializer.instance))
+        return Response(read_serializer.data, headers=_validator_headers(self, serializer.instance))
+
+
+# Bulk update is a `PUT`/`PATCH` action over the list url (`<prefix>/bulk/`) added by its own mixin, so the route only
+# exists in the viewsets opting in. The payload is a list of items identified by `bulk_update_lookup_field`, the
+# targets are loaded in one query, every item is validated (errors are reported by item index) and the changed fields
+# are saved with a single `bulk_update`.
+
+# ??? note
+#
+# As with bulk creation, `bulk_update` skips `save()`, the model signals and the serializer `update()`, many to many
+# values are set one instance at a time. Custom update logic belongs to an override of `perform_bulk_update`.
+
+# noinspection PyUnresolvedReferences
+class BulkUpdateVerboseModelMixin(UpdateVerboseModelMixin):
+    """
+    This class is a mixin that adds a bulk update action to the verbose update.
+    """
+
+    bulk_update_lookup_field = "id"
+    bulk_update_batch_size = 500
+
+    @action(detail=False, methods=["put", "patch"], url_path="bulk")
+    def bulk_update(self, request, *args, **kwargs):
+        if not isinstance(request.data, list):
+            raise ValidationError({"non_field_errors": ["Expected a list of items."]})
+
+        partial = request.method == "PATCH"
+        lookup = self.bulk_update_lookup_field
+        model_field = self.get_queryset().model._meta.get_field(lookup)
+
+        errors, keys, seen = {}, {}, set()
+        for index, item in enumerate(request.data):
+            try:
+                key = model_field.to_python(item[lookup])
+            except (TypeError, KeyError):
+                errors[index] = {lookup: ["This field is required."]}
+                continue
+            except DjangoValidationError as e:
+                errors[index] = {lookup: e.messages}
+                continue
+            if key in seen:
+                errors[index] = {lookup: ["Duplicated item."]}
+                continue
+            seen.add(key)
+            keys[index] = key
+        targets = self.filter_queryset(self.get_queryset()).in_bulk(set(keys.values()), field_name=lookup)
+
+        serializers = []
+        for index, key in keys.items():
+            instance = targets.get(key)
+            if instance is None:
+                errors[index] = {lookup: ["Not found."]}
+                continue
+            self.check_object_permissions(request, instance)
+            serializer = self.get_serializer(instance, data=request.data[index], partial=partial)
+            if serializer.is_valid():
+                serializers.append(serializer)
+            else:
+                errors[index] = serializer.errors
+        if errors:
+            raise ValidationError(dict(sorted(errors.items())))
+
+        instances = self.perform_bulk_update(serializers)
+        read_serializer = self.get_read_serializer(self.get_read_objects(instances), many=True)
         return Response(read_serializer.data)
+
+    def perform_bulk_update(self, serializers):
+        """
+        Save the changes of many validated serializers and return the updated instances
+        """
+        model = self.get_queryset().model
+        many = {f.name for f in model._meta.get_fields() if isinstance(f, ManyToManyField)}
+        # compare foreign keys by their column, reading the relation would load the related object
+        forward = {f.name: f for f in model._meta.concrete_fields if f.is_relation}
+        instances, changed, relations = [], set(), []
+        for serializer in serializers:
+            instance = serializer.instance
+            for attr, value in serializer.validated_data.items():
+                if attr in many:
+                    relations.append((instance, attr, value))
+                elif attr in forward:
+                    model_field = forward[attr]
+                    key = None if value is None else getattr(value, model_field.target_field.attname)
+                    if getattr(instance, model_field.attname) != key:
+                        setattr(instance, attr, value)
+                        changed.add(attr)
+                elif getattr(instance, attr) != value:
+                    setattr(instance, attr, value)
+                    changed.add(attr)
+            instances.append(instance)
+
+        with transaction.atomic(using=router.db_for_write(model)):
+            if changed:
+                model._default_manager.bulk_update(
+                    instances, sorted(changed), batch_size=self.bulk_update_batch_size
+                )
+            for instance, attr, value in relations:
+                getattr(instance, attr).set(value)
+
+        for instance in instances:
+            if getattr(instance, "_prefetched_objects_cache", None):
+                instance._prefetched_objects_cache = {}
+        return instances
+
+
+# ## Conditional mixins
+
+# Clients polling a read endpoint get the same representation again and again, paying the queries, the serialization
+# and the rendering every time. The conditional mixin computes a cheap validator before building any serializer: the
+# `last_modified_field` and/or `version_field` columns of the object for `retrieve`, and their `max()`/`sum()` plus
+# the row count of the filtered queryset for `list`. The `ETag` also covers the viewset, the action, the API version,
+# the query params (RESTQL query, filters, page) and the accepted media type, so a matching `If-None-Match` (or
+# `If-Modified-Since`) gets a `304 Not Modified`. Validator fields missing on the model are ignored, without any of
+# them the responses are not conditional. The verbose create and update responses send the `ETag` a later
+# `retrieve` with the same query params would send.
+
+# ??? note
+#
+# Place it before any other list or retrieve mixin, it delegates the list building to them.
+
+def _validator_headers(viewset, instance) -> dict:
+    """
+    Return the `ETag` and `Last-Modified` headers of an instance if the viewset is conditional
+    """
+    get_object_validators = getattr(viewset, "get_object_validators", None)
+    if get_object_validators is None:
+        return {}
+    return _headers(*get_object_validators(instance))
+
+
+def _has_field(model, lookup: str) -> bool:
+    """
+    Return whether `lookup` (maybe spanning relations) reaches a field of `model`
+    """
+    for name in lookup.split("__"):
+        if model is None:
+            return False
+        try:
+            model_field = model._meta.get_field(name)
+        except FieldDoesNotExist:
+            return False
+        model = model_field.related_model
+    return True
+
+
+def _timestamp(last_modified) -> int | None:
+    return int(last_modified.timestamp()) if isinstance(last_modified, datetime) else None
+
+
+def _headers(etag: str | None, last_modified) -> dict:
+    headers = {}
+    if etag is not None:
+        headers["ETag"] = etag
+    timestamp = _timestamp(last_modified)
+    if timestamp is not None:
+        headers["Last-Modified"] = http_date(timestamp)
+    return headers
+
+
+# noinspection PyUnresolvedReferences
+class ConditionalReadModelMixin(mixins.RetrieveModelMixin, mixins.ListModelMixin):
+    """
+    This class is a mixin that answers `retrieve` and `list` with `304 Not Modified` when the client representation
+    is still valid.
+    """
+
+    last_modified_field: str | None = "updated_at"
+    version_field: str | None = None
+
+    def get_validator_key(self, action: str) -> tuple:
+        """
+        Return everything besides the data that changes the representation
+        """
+        klass = type(self)
+        return (
+            f"{klass.__module__}.{klass.__qualname__}",
+            action,
+            getattr(self.request, "version", None),
+            tuple(sorted((key, tuple(values)) for key, values in self.request.query_params.lists())),
+            getattr(self.request, "accepted_media_type", None),
+        )
+
+    def make_etag(self, action: str, *values) -> str:
+        digest = hashlib.sha1(repr((self.get_validator_key(action), values)).encode()).hexdigest()
+        return f'W/"{digest}"'
+
+    def get_object_validators(self, instance) -> tuple[str | None, datetime | None]:
+        """
+        Return the `ETag` and last modification of an instance, `(None, None)` if it has no validator columns
+        """
+        last_modified = getattr(instance, self.last_modified_field, None) if self.last_modified_field else None
+        version = getattr(instance, self.version_field, None) if self.version_field else None
+        if last_modified is None and version is None:
+            return None, None
+        return self.make_etag("retrieve", instance.pk, last_modified, version), last_modified
+
+    def get_list_validators(self, queryset) -> tuple[str | None, datetime | None]:
+        """
+        Return the `ETag` and last modification of a queryset with a single aggregate query
+        """
+        aggregates = {}
+        if self.last_modified_field and _has_field(queryset.model, self.last_modified_field):
+            aggregates["last_modified"] = Max(self.last_modified_field)
+        if self.version_field and _has_field(queryset.model, self.version_field):
+            aggregates["version"] = Sum(self.version_field)
+        if not aggregates:
+            return None, None
+        values = queryset.order_by().aggregate(count=Count("pk"), **aggregates)
+        etag = self.make_etag("list", values["count"], values.get("last_modified"), values.get("version"))
+        return etag, values.get("last_modified")
+
+    def conditional_response(self, etag: str | None, last_modified, respond):
+        """
+        Return a `304 Not Modified` if the client representation is still valid, otherwise `respond()`, both with the
+        validator headers
+        """
+        response = None
+        if etag is not None or last_modified is not None:
+            response = get_conditional_response(self.request, etag=etag, last_modified=_timestamp(last_modified))
+        if response is None:
+            response = respond()
+        for header, value in _headers(etag, last_modified).items():
+            response[header] = value
+        return response
+
+    def retrieve(self, request, *args, **kwargs):
+        instance = self.get_object()
+        etag, last_modified = self.get_object_validators(instance)
+        return self.conditional_response(
+            etag, last_modified, lambda: Response(self.get_serializer(instance).data)
+        )
+
+    def list(self, request, *args, **kwargs):
+        etag, last_modified = self.get_list_validators(self.filter_queryset(self.get_queryset()))
+        return self.conditional_response(
+            etag, last_modified, lambda: super(ConditionalReadModelMixin, self).list(request, *args, **kwargs)
+        )
+
+
+# ## Cache mixins
+
+# Catalog like endpoints are read far more often than written, the cache mixin keeps the rendered `list` and
+# `retrieve` responses in a django cache. The key covers the viewset, the action, the scheme and host (hyperlinks are
+# absolute), the API version, the url kwargs, the query params (RESTQL query included), the accepted media type, a
+# fingerprint of the user permissions and the generation of every model the response depends on
+# (`cache_dependencies`, the queryset model by default).
+#
+# Nothing is deleted on writes: `post_save`, `post_delete` and `m2m_changed` receivers bump the generation of the
+# model (kept in the default cache, `cache` only stores the responses), so the next read builds a new key and the stale
+# entries expire by themselves. The save and delete receivers are plugged per model (and its subclasses) when a cached
+# viewset class is defined, so every process importing it invalidates on writes, and they can be unplugged with
+# `OutSignal` (or coalesced with `CoalescedSignal`) during bulk work, calling `invalidate_model_cache` once when it's
+# done:
+
+# ```python
+# with OutSignal(signals.post_save, invalidate_model_cache, Book):
+#     <bulk work>
+# invalidate_model_cache(Book)
+# ```
+
+# Processes writing without importing the viewsets (task workers, management commands) must watch the models too,
+# calling `watch_model` from an `AppConfig.ready`, the same goes for viewsets without a `queryset` attribute nor
+# `cache_dependencies`.
+
+# ??? warning
+#
+# Users with the same permissions share the cached responses. If the queryset depends on the user (own objects,
+# row level permissions) set `cache_per_user = True`.
+
+_GENERATION_PREFIX = "dauto:generation:"
+_watched_models: set = set()
+_watch_lock = threading.Lock()
+
+
+def _generation_key(model) -> str:
+    return f"{_GENERATION_PREFIX}{model._meta.label_lower}"
+
+
+def _bump(models, cache):
+    for model in models:
+        key = _generation_key(model)
+        try:
+            cache.incr(key)
+        except ValueError:
+            # a fresh generation must not collide with one evicted from the cache
+            cache.add(key, time.time_ns(), None)
+
+
+def invalidate_model_cache(sender, cache=default_cache, **kwargs):
+    """
+    Receiver invalidating the cached responses depending on a model (and its parents), can be called directly after
+    a bulk operation
+    """
+    _bump([sender, *sender._meta.get_parent_list()], cache)
+
+
+@batch(invalidate_model_cache)
+def _invalidate_model_cache_batch(sender, instances, signal, kwargs):
+    invalidate_model_cache(sender)
+
+
+def _is_watched(model) -> bool:
+    return any(issubclass(model, watched) for watched in tuple(_watched_models))
+
+
+def _on_m2m_changed(sender, instance, model, action, **kwargs):
+    if not action.startswith("post_"):
+        return
+    for changed in (type(instance), model):
+        if _is_watched(changed):
+            invalidate_model_cache(changed)
+
+
+def _connect(model):
+    signals.post_save.connect(invalidate_model_cache, sender=model)
+    signals.post_delete.connect(invalidate_model_cache, sender=model)
+
+
+def watch_model(model):
+    """
+    Plug the invalidation receivers of a model and its subclasses (the ones loaded later included). Cached viewsets
+    watch their dependencies when they are defined, call it from `AppConfig.ready` in processes writing the model
+    without importing the viewsets (workers, commands) or for viewsets resolving their queryset at runtime.
+    """
+    with _watch_lock:
+        if model in _watched_models:
+            return
+        _watched_models.add(model)
+        for models in list(apps.all_models.values()):
+            for candidate in list(models.values()):
+                if issubclass(candidate, model):
+                    _connect(candidate)
+
+
+# noinspection PyUnusedLocal
+def _on_class_prepared(sender, **kwargs):
+    with _watch_lock:
+        if _is_watched(sender):
+            _connect(sender)
+
+
+signals.class_prepared.connect(_on_class_prepared, dispatch_uid="dauto_response_cache_models")
+signals.m2m_changed.connect(_on_m2m_changed, dispatch_uid="dauto_response_cache_m2m")
+
+
+def get_generations(models, cache=default_cache) -> tuple:
+    """
+    Return the current generation of some models with a single cache read
+    """
+    keys = [_generation_key(model) for model in models]
+    values = cache.get_many(keys)
+    for key in keys:
+        if key not in values:
+            cache.add(key, time.time_ns(), None)
+            values[key] = cache.get(key)
+    return tuple(values[key] for key in keys)
+
+
+# noinspection PyUnresolvedReferences
+class CachedReadModelMixin(mixins.RetrieveModelMixin, mixins.ListModelMixin):
+    """
+    This class is a mixin that caches the rendered `retrieve` and `list` responses until a model they depend on changes
+    """
+
+    cache = default_cache
+    cache_timeout = 300
+    cache_dependencies: list | None = None
+    cache_per_user = False
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        queryset = getattr(cls, "queryset", None)
+        for model in cls.cache_dependencies or ([queryset.model] if queryset is not None else []):
+            watch_model(model)
+
+    def get_cache_dependencies(self) -> list:
+        return list(self.cache_dependencies or [self.get_queryset().model])
+
+    def get_permission_fingerprint(self) -> tuple:
+        """
+        Return a value shared by the users allowed to see the same responses
+        """
+        user = getattr(self.request, "user", None)
+        if self.cache_per_user:
+            return "user", getattr(user, "pk", None)
+        if user is None or not user.is_authenticated:
+            return ("anonymous",)
+        from dauto.drf.permission import get_cached_permissions
+
+        permissions = get_cached_permissions(user)
+        return user.is_staff, user.is_superuser, tuple(sorted(permissions))
+
+    def get_response_cache_key(self) -> str:
+        dependencies = self.get_cache_dependencies()
+        for model in dependencies:
+            watch_model(model)
+        klass = type(self)
+        parts = (
+            f"{klass.__module__}.{klass.__qualname__}",
+            self.action,
+            # hyperlinked serializers render absolute urls
+            self.request.scheme,
+            self.request.get_host(),
+            getattr(self.request, "version", None),
+            tuple(sorted(self.kwargs.items())),
+            tuple(sorted((key, tuple(values)) for key, values in self.request.query_params.lists())),
+            getattr(self.request, "accepted_media_type", None),
+            self.get_permission_fingerprint(),
+            get_generations(dependencies),
+        )
+        return f"dauto:response:{hashlib.sha1(repr(parts).encode()).hexdigest()}"
+
+    def cached_response(self, respond):
+        """
+        Return the cached response or `respond()`, storing it once rendered
+        """
+        key = self.get_response_cache_key()
+        cached = self.cache.get(key)
+        if cached is not None:
+            content, content_type = cached
+            return HttpResponse(content, content_type=content_type)
+
+        response = respond()
+        if response.status_code == status.HTTP_200_OK and hasattr(response, "add_post_render_callback"):
+            response.add_post_render_callback(
+                lambda rendered: self.cache.set(key, (rendered.content, rendered["Content-Type"]), self.cache_timeout)
+            )
+        return response
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(lambda: super(CachedReadModelMixin, self).retrieve(request, *args, **kwargs))
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(lambda: super(CachedReadModelMixin, self).list(request, *args, **kwargs))
+
+
+# ## Streaming mixins
+
+# A list action builds the whole queryset, the whole representation list and the whole rendered body in memory before
+# sending a byte. The streaming list mixin iterates the queryset in chunks of `stream_chunk_size` rows (with
+# `iterator(chunk_size=...)`, prefetches included), serializes each chunk with the list serializer (so sorted fields,
+# RESTQL field selection and friends keep working) and sends it as soon as it's rendered, as fragments of a JSON array
+# or as NDJSON (one object per line) when `stream_format = "ndjson"` or the client asks for it (`Accept:
+# application/x-ndjson` or `?format=ndjson`).
+
+# ??? note
+#
+# Paginated viewsets keep the regular list, a page is already bounded. The status and headers are sent before the
+# first row is serialized, an error in the middle of the stream truncates the body.
+
+def _chunks(iterable, size: int):
+    iterator = iter(iterable)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+class NDJSONRenderer(JSONRenderer):
+    """
+    Renderer for newline delimited JSON, lists are rendered an item per line
+    """
+
+    media_type = "application/x-ndjson"
+    format = "ndjson"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if not isinstance(data, list):
+            return super().render(data, accepted_media_type, renderer_context)
+        return b"".join(super(NDJSONRenderer, self).render(item) + b"\n" for item in data)
+
+
+# noinspection PyUnresolvedReferences
+class StreamingListModelMixin(mixins.ListModelMixin):
+    """
+    This class is a mixin that streams the list output in chunks instead of rendering it at once.
+    """
+
+    stream_chunk_size = 2000
+    stream_format = "json"
+
+    def get_renderers(self):
+        renderers = super().get_renderers()
+        if not any(isinstance(renderer, NDJSONRenderer) for renderer in renderers):
+            renderers.append(NDJSONRenderer())
+        return renderers
+
+    def get_stream_format(self) -> str:
+        accepted = getattr(self.request, "accepted_renderer", None)
+        if isinstance(accepted, NDJSONRenderer):
+            return "ndjson"
+        return self.stream_format
+
+    def stream_chunks(self, queryset):
+        """
+        Yield the representation of the queryset rows, a list per chunk
+        """
+        rows = queryset.iterator(chunk_size=self.stream_chunk_size)
+        for chunk in _chunks(rows, self.stream_chunk_size):
+            yield self.get_serializer(chunk, many=True).data
+
+    def stream_json(self, queryset):
+        renderer = JSONRenderer()
+        yield b"["
+        separator = b""
+        for data in self.stream_chunks(queryset):
+            # render the chunk as a list and drop the brackets, much cheaper than rendering row by row
+            yield separator + renderer.render(data)[1:-1]
+            separator = b","
+        yield b"]"
+
+    def stream_ndjson(self, queryset):
+        renderer = NDJSONRenderer()
+        for data in self.stream_chunks(queryset):
+            yield renderer.render(data)
+
+    def list(self, request, *args, **kwargs):
+        if self.paginator is not None:
+            return super().list(request, *args, **kwargs)
+
+        queryset = self.filter_queryset(self.get_queryset())
+        if self.get_stream_format() == "ndjson":
+            return StreamingHttpResponse(self.stream_ndjson(queryset), content_type=NDJSONRenderer.media_type)
+        return StreamingHttpResponse(self.stream_json(queryset), content_type="application/json")
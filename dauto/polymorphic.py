@@ -1,7 +1,13 @@
 # # Polymorphic
 
+import contextvars
+import functools
+import threading
 import typing
+from collections import defaultdict
+from collections.abc import Mapping
 from django.db.models import deletion, Model
+from django.db.models.manager import BaseManager
 from contextlib import contextmanager
 from ._utils.using import using
 
@@ -26,26 +32,117 @@ def polymorphic(model: Model, *_serializers: str, resourcetype_name="resourcetyp
         raise ImportError("You must install dauto[polymorphic-rest] package to use this package.")
 
     final_klass_name = f"{model.__class__.__name__}PolymorphicSerializer"
-    classes = [using(s) for s in _serializers]
     return type(
         final_klass_name,
         (PolymorphicSerializer,),
         {
             "resource_type_field_name": resourcetype_name,
-            "model_serializer_mapping": {
-                k.Meta.model: k for k in classes  # type: ignore
-            },
+            "model_serializer_mapping": _LazySerializerMapping(_serializers),
+            "Meta": type("Meta", (), {"list_serializer_class": _polymorphic_list_serializer()}),
         },
     )
 
 
-@contextmanager
-def collector(klass: typing.Type[deletion.Collector]):
+# The serializers are given as dotted paths and imported the first time the polymorphic serializer is used, not when
+# `polymorphic()` is called, so the modules declaring them (and their models) are not pulled in at startup and can
+# import each other in any order.
+
+class _LazySerializerMapping:
     """
-    This method monkey patch the collect method in an admin class in certain context to use
-    polymorphic complaints operations over the related models
+    Descriptor resolving the `model_serializer_mapping` of a polymorphic serializer on first access
     """
 
+    def __init__(self, paths: typing.Iterable[str]):
+        self.paths = tuple(paths)
+        self.mapping = None
+
+    def __get__(self, instance, owner):
+        if self.mapping is None:
+            classes = [using(s) for s in self.paths]
+            self.mapping = {k.Meta.model: k for k in classes}  # type: ignore
+        return self.mapping
+
+
+# A list of polymorphic instances serialized one by one pays, for each instance that is not downcast (e.g. from a
+# `non_polymorphic()` queryset or a relation of the base model), a query to fetch its child row and a lookup of its
+# serializer. The generated serializers use a list serializer that groups the page by concrete model, fetches each
+# group child rows in one query and dispatches every group to its serializer.
+
+@functools.cache
+def _polymorphic_list_serializer():
+    from rest_framework.serializers import ListSerializer
+
+    class PolymorphicListSerializer(ListSerializer):
+        """
+        List serializer batching the child rows loading of polymorphic instances
+        """
+
+        # noinspection PyMethodMayBeStatic
+        def get_child_queryset(self, model, queryset, serializer):
+            """
+            Hook to prepare the queryset fetching the child rows of a concrete model, by default it's planned with
+            the child serializer.
+            """
+            from dauto.drf.planner import plan
+
+            return plan(queryset, serializer)
+
+        def downcast(self, instances: list) -> list:
+            """
+            Replace each polymorphic instance by its concrete model instance with a query per concrete model
+            """
+            pending = defaultdict(list)
+            for position, instance in enumerate(instances):
+                get_real_class = getattr(instance, "get_real_instance_class", None)
+                if get_real_class is None:
+                    continue
+                real_class = get_real_class()
+                if real_class is not None and real_class is not type(instance):
+                    pending[real_class].append(position)
+
+            instances = list(instances)
+            for real_class, positions in pending.items():
+                serializer = self.child._get_serializer_from_model_or_instance(real_class)
+                queryset = self.get_child_queryset(
+                    real_class,
+                    real_class._default_manager.filter(pk__in=[instances[p].pk for p in positions]),
+                    serializer,
+                )
+                real_instances = queryset.in_bulk()
+                for position in positions:
+                    instances[position] = real_instances.get(instances[position].pk, instances[position])
+            return instances
+
+        def to_representation(self, data):
+            iterable = data.all() if isinstance(data, BaseManager) else data
+            instances = self.downcast(list(iterable))
+
+            serializers, representations = {}, []
+            for instance in instances:
+                if isinstance(instance, Mapping):
+                    representations.append(self.child.to_representation(instance))
+                    continue
+                model = type(instance)
+                if model not in serializers:
+                    serializers[model] = (
+                        self.child._get_serializer_from_model_or_instance(model),
+                        self.child.to_resource_type(model),
+                    )
+                serializer, resource_type = serializers[model]
+                representation = serializer.to_representation(instance)
+                representation[self.child.resource_type_field_name] = resource_type
+                representations.append(representation)
+            return representations
+
+    return PolymorphicListSerializer
+
+
+# Django deletion collector assumes every object in a `collect` call shares the model of the first one, which is
+# not true for polymorphic querysets (a list of `Item` may hold `Book` and `Film` instances). The collector fix
+# groups the objects by their concrete class and collects each group in one call, keeping the cascade of every
+# child model.
+
+def _polymorphic_model() -> type:
     # ??? warning
     #
     # We need to check if polymorphic packages are installed
@@ -54,16 +151,108 @@ def collector(klass: typing.Type[deletion.Collector]):
         from polymorphic.models import PolymorphicModel
     except ImportError as e:
         raise ImportError("You must install dauto[polymorphic-model] package to use this package.")
+    return PolymorphicModel
+
+
+def _collect_grouped(collect: typing.Callable, objs, polymorphic_model: type, **kwargs):
+    """
+    Call `collect` once per concrete class of polymorphic objects, once for the whole lot otherwise
+    """
+    if len(objs) > 0 and isinstance(objs[0], polymorphic_model):
+        groups = defaultdict(list)
+        for o in objs:
+            groups[type(o)].append(o)
+        for group in groups.values():
+            collect(group, **kwargs)
+    else:
+        collect(objs, **kwargs)
+
 
-    original = getattr(klass, "collect")
+# Callers building the collector themselves (e.g. an admin `get_deleted_objects` using `NestedObjects`) mix the fix in
+# their collector class, no patching involved:
 
-    def custom(self, objs, source=None, source_attr=None, **kwargs):
-        if len(objs) > 0 and isinstance(objs[0], PolymorphicModel):
-            for o in objs:
-                original(self, [o], source=None, source_attr=None, **kwargs)
+# ```python
+# class PolymorphicNestedObjects(PolymorphicCollectMixin, NestedObjects):
+#     pass
+# ```
+
+class PolymorphicCollectMixin:
+    """
+    Collector mixin collecting polymorphic objects grouped by concrete class
+    """
+
+    def collect(self, objs, source=None, source_attr=None, **kwargs):
+        _collect_grouped(
+            super().collect, objs, _polymorphic_model(), source=source, source_attr=source_attr, **kwargs
+        )
+
+
+class PolymorphicCollector(PolymorphicCollectMixin, deletion.Collector):
+    """
+    Deletion collector for polymorphic objects
+    """
+
+
+# `Model.delete` and `QuerySet.delete` build a `deletion.Collector` themselves, so the `collector` context still swaps
+# the `collect` attribute of the collector class for the whole process: the patched method is installed when the
+# first context over that class is entered and the original is restored when the last one exits. Meanwhile it only
+# behaves polymorphically inside a `collector` context (tracked with a context variable), so deletions running
+# concurrently in other threads get the original behavior.
+
+_active_collectors = contextvars.ContextVar("dauto_polymorphic_collectors", default=frozenset())
+_original_collects = {}
+_patch_counts = defaultdict(int)
+_patch_lock = threading.Lock()
+
+
+def _install_collect(klass: typing.Type[deletion.Collector], polymorphic_model: type):
+    with _patch_lock:
+        _patch_counts[klass] += 1
+        if klass in _original_collects:
+            return
+        original = klass.__dict__.get("collect")
+        inherited = getattr(klass, "collect")
+
+        def collect(self, objs, source=None, source_attr=None, **kwargs):
+            if klass not in _active_collectors.get():
+                return inherited(self, objs, source=source, source_attr=source_attr, **kwargs)
+            _collect_grouped(
+                functools.partial(inherited, self),
+                objs,
+                polymorphic_model,
+                source=source,
+                source_attr=source_attr,
+                **kwargs,
+            )
+
+        _original_collects[klass] = original
+        klass.collect = collect
+
+
+def _uninstall_collect(klass: typing.Type[deletion.Collector]):
+    with _patch_lock:
+        _patch_counts[klass] -= 1
+        if _patch_counts[klass] > 0:
+            return
+        del _patch_counts[klass]
+        original = _original_collects.pop(klass)
+        if original is None:
+            # the collector inherited `collect`
+            del klass.collect
         else:
-            original(self, objs, source=None, source_attr=None, **kwargs)
+            klass.collect = original
+
 
-    klass.collect = custom
-    yield
-    klass.collect = original
+@contextmanager
+def collector(klass: typing.Type[deletion.Collector]):
+    """
+    This method monkey patch the collect method in an admin class in certain context to use
+    polymorphic complaints operations over the related models
+    """
+    _install_collect(klass, _polymorphic_model())
+    token = _active_collectors.set(_active_collectors.get() | {klass})
+    try:
+        yield
+    finally:
+        _active_collectors.reset(token)
+        _uninstall_collect(klass)
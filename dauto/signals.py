@@ -10,6 +10,19 @@
 
 # Will execute the `code` section with the signal unplugged, avoiding circular imports and nested signal calls
 
+import functools
+import logging
+import math
+import threading
+import time
+from collections import deque
+from contextlib import ExitStack
+from dataclasses import dataclass, field
+
+from django.db import connections
+
+logger = logging.getLogger("dauto.signals")
+
 class OutSignal:
     """
     This class represents a context manager for disconnecting and reconnecting signal handlers.
@@ -45,3 +58,345 @@ class OutSignal:
             sender=self.sender,
             dispatch_uid=self.dispatch_uid
         )
+
+
+# ## Coalescing signals
+
+# Unplugging a receiver loses its side effects, and keeping it plugged during a bulk import pays a receiver call per
+# saved row. `CoalescedSignal` sits in the middle: it unplugs the receiver, buffers the instances the signal would have
+# dispatched and calls the receiver once on exit.
+
+# ```python
+# with CoalescedSignal(post_save, reindex, Book) as coalesced:
+#     for row in rows:
+#         Book.objects.create(**row)  # 👈 buffered, not dispatched
+#     books = Book.objects.bulk_create(more)
+#     coalesced.add(books, created=True)  # 👈 bulk operations don't send signals, buffer them by hand
+# ```
+
+# On exit the buffered instances are deduplicated by primary key (the last dispatch wins) and the receiver is called
+# through its batch hook, registered with the `batch` decorator, or once per instance if it has none:
+
+# ```python
+# @batch(reindex)
+# def reindex_many(sender, instances, signal, kwargs):
+#     search.index(instances)
+# ```
+
+# `kwargs` holds the extra arguments of every dispatch (`created`, `update_fields`, ...) in the same order as `instances`.
+# Dispatches of custom signals without an `instance` are replayed one by one to the receiver.
+
+# ??? warning
+#
+# Like `OutSignal` the receiver is unplugged for the whole process while the context is active, instances saved by
+# other threads meanwhile are buffered too. Nothing is dispatched if the block raises.
+
+
+def batch(receiver):
+    """
+    Register the decorated function as the batch hook of a receiver, used by `CoalescedSignal` to dispatch all the
+    buffered instances in a single call
+
+    Parameters:
+        receiver: The per instance receiver
+    """
+
+    def decorator(func):
+        receiver.batch = func
+        return func
+
+    return decorator
+
+
+class CoalescedSignal(OutSignal):
+    """
+    Context manager that suspends a receiver, buffers the instances dispatched to it and calls it once on exit.
+    """
+
+    def __init__(self, signal, receiver, sender, dispatch_uid=None):
+        super().__init__(signal, receiver, sender, dispatch_uid)
+        self.buffer = {}
+
+    def _buffer_uid(self):
+        return f"dauto.signals.coalesce.{id(self)}"
+
+    def _on_signal(self, sender, instance=None, signal=None, **kwargs):
+        if instance is None:
+            # custom signals may carry no instance, nothing to deduplicate: each dispatch is replayed as is
+            self.buffer[(sender, object())] = (None, None, kwargs)
+            return
+        self.add([instance], sender=sender, **kwargs)
+
+    def add(self, instances, sender=None, **kwargs):
+        """
+        Buffer instances as if the signal was dispatched for each one, this is the way to notify instances created or
+        updated with `bulk_create`/`bulk_update`
+
+        Parameters:
+            instances: The instances to buffer
+            sender: The sender of the dispatch, the instance model by default
+            **kwargs: The extra arguments of the dispatch (`created`, `update_fields`, ...)
+        """
+        for instance in instances:
+            model = sender or type(instance)
+            if self.sender is not None and model is not self.sender:
+                continue
+            pk = instance.pk
+            key = (model, pk) if pk is not None else (model, id(instance))
+            # re-inserting moves the key to the end, so the replay follows the last dispatch order
+            self.buffer.pop(key, None)
+            self.buffer[key] = (instance, pk, kwargs)
+
+    def flush(self):
+        """
+        Dispatch the buffered instances to the receiver and empty the buffer
+        """
+        groups, bare = {}, []
+        for (model, _), (instance, pk, kwargs) in self.buffer.items():
+            if instance is None:
+                bare.append((model, kwargs))
+            else:
+                groups.setdefault(model, []).append((instance, pk, kwargs))
+        self.buffer = {}
+
+        for model, kwargs in bare:
+            self.receiver(signal=self.signal, sender=model, **kwargs)
+
+        hook = getattr(self.receiver, "batch", None)
+        for model, dispatches in groups.items():
+            # the deletion collector clears the primary key of deleted instances after dispatching `post_delete`,
+            # receivers get it back while they run as they would have in the original dispatch
+            cleared = [(instance, pk) for instance, pk, _ in dispatches if instance.pk is None and pk is not None]
+            for instance, pk in cleared:
+                instance.pk = pk
+            try:
+                if hook is not None:
+                    hook(
+                        sender=model,
+                        instances=[instance for instance, _, _ in dispatches],
+                        signal=self.signal,
+                        kwargs=[kwargs for _, _, kwargs in dispatches],
+                    )
+                else:
+                    for instance, _, kwargs in dispatches:
+                        self.receiver(signal=self.signal, sender=model, instance=instance, **kwargs)
+            finally:
+                for instance, _ in cleared:
+                    instance.pk = None
+
+    def __enter__(self):
+        super().__enter__()
+        self.signal.connect(self._on_signal, sender=self.sender, weak=False, dispatch_uid=self._buffer_uid())
+        return self
+
+    # noinspection PyShadowingBuiltins
+    def __exit__(self, type, value, traceback):
+        self.signal.disconnect(sender=self.sender, dispatch_uid=self._buffer_uid())
+        super().__exit__(type, value, traceback)
+        if type is None:
+            self.flush()
+        else:
+            self.buffer = {}
+
+
+class CoalescedSignals:
+    """
+    Context manager coalescing several `(signal, receiver, sender)` registrations at once.
+    """
+
+    def __init__(self, *registrations):
+        """
+        Parameters:
+        - registrations: `(signal, receiver, sender)` or `(signal, receiver, sender, dispatch_uid)` tuples
+        """
+        self.coalesced = [CoalescedSignal(*registration) for registration in registrations]
+
+    def add(self, instances, signal=None, sender=None, **kwargs):
+        """
+        Buffer instances on every registration of `signal` (all of them by default), see `CoalescedSignal.add`
+        """
+        instances = list(instances)
+        for coalesced in self.coalesced:
+            if signal is None or coalesced.signal is signal:
+                coalesced.add(instances, sender=sender, **kwargs)
+
+    def __enter__(self):
+        entered = []
+        try:
+            for coalesced in self.coalesced:
+                coalesced.__enter__()
+                entered.append(coalesced)
+        except BaseException:
+            for coalesced in reversed(entered):
+                coalesced.__exit__(None, None, None)
+            raise
+        return self
+
+    # noinspection PyShadowingBuiltins
+    def __exit__(self, type, value, traceback):
+        for coalesced in reversed(self.coalesced):
+            coalesced.__exit__(type, value, traceback)
+
+
+# ## Profiling receivers
+
+# Saves get slow because of the receivers plugged to their signals, but which ones? `SignalProfiler` wraps the
+# dispatch of the given signals and records, per receiver, the number of calls, the cumulative and p95 time and the
+# database queries issued while it runs.
+
+# ```python
+# with SignalProfiler(post_save, m2m_changed, slow_threshold=0.05) as profiler:
+#     <code>
+# profiler.stats  # 👈 {"app.receivers.reindex": ReceiverStats(calls=..., total=..., queries=...), ...}
+# ```
+
+# Every call is also handed to the `sink` callable (a `ReceiverCall`), `log_sink` logs them, and calls slower than
+# `slow_threshold` seconds are logged as warnings in the `dauto.signals` logger. The profiler can be kept installed
+# for the whole process with `install()`/`uninstall()`.
+
+# ??? note
+#
+# Only synchronous receivers are profiled. The `(receiver, response)` pairs returned by `send()` hold the profiling
+# wrapper, the original receiver is its `__wrapped__` attribute.
+
+
+@dataclass
+class ReceiverCall:
+    """
+    A profiled receiver call
+    """
+
+    signal: object
+    receiver: str
+    sender: object
+    duration: float
+    queries: int
+
+
+@dataclass
+class ReceiverStats:
+    """
+    Aggregated calls of a receiver, the p95 is computed over the last `samples` calls
+    """
+
+    calls: int = 0
+    total: float = 0.0
+    queries: int = 0
+    durations: deque = field(default_factory=lambda: deque(maxlen=1000))
+
+    @property
+    def p95(self) -> float:
+        if not self.durations:
+            return 0.0
+        durations = sorted(self.durations)
+        return durations[math.ceil(0.95 * len(durations)) - 1]
+
+
+def log_sink(call: ReceiverCall):
+    """
+    Sink logging every profiled call at debug level
+    """
+    logger.debug("%s took %.6fs and %d queries", call.receiver, call.duration, call.queries)
+
+
+def _receiver_name(receiver) -> str:
+    return f"{getattr(receiver, '__module__', '?')}.{getattr(receiver, '__qualname__', repr(receiver))}"
+
+
+class SignalProfiler:
+    """
+    Context manager that profiles the receivers of some signals.
+    """
+
+    def __init__(self, *signals, sink=None, slow_threshold: float | None = None, samples: int = 1000):
+        """
+        Parameters:
+        - signals: The signals to profile
+        - sink: An optional callable receiving every `ReceiverCall`
+        - slow_threshold: Duration in seconds, slower calls are logged as warnings
+        - samples: The number of calls per receiver kept to compute the p95
+        """
+        self.signals = signals
+        self.sink = sink
+        self.slow_threshold = slow_threshold
+        self.samples = samples
+        self.stats: dict[str, ReceiverStats] = {}
+        self._lock = threading.Lock()
+        self._wrappers = {}
+
+    def _record(self, call: ReceiverCall):
+        with self._lock:
+            stats = self.stats.get(call.receiver)
+            if stats is None:
+                stats = self.stats[call.receiver] = ReceiverStats(durations=deque(maxlen=self.samples))
+            stats.calls += 1
+            stats.total += call.duration
+            stats.queries += call.queries
+            stats.durations.append(call.duration)
+        if self.sink is not None:
+            self.sink(call)
+        if self.slow_threshold is not None and call.duration > self.slow_threshold:
+            logger.warning(
+                "Slow signal receiver %s took %.6fs and %d queries (sender %r)",
+                call.receiver, call.duration, call.queries, call.sender
+            )
+
+    def _wrap(self, signal, receiver):
+        key = (id(signal), id(receiver))
+        wrapper = self._wrappers.get(key)
+        if wrapper is not None and wrapper.__wrapped__ is receiver:
+            return wrapper
+        name = _receiver_name(receiver)
+
+        @functools.wraps(receiver)
+        def wrapper(*args, **kwargs):
+            queries = 0
+
+            def count(execute, *a):
+                nonlocal queries
+                queries += 1
+                return execute(*a)
+
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(count))
+                start = time.perf_counter()
+                try:
+                    return receiver(*args, **kwargs)
+                finally:
+                    duration = time.perf_counter() - start
+                    self._record(ReceiverCall(signal, name, kwargs.get("sender"), duration, queries))
+
+        self._wrappers[key] = wrapper
+        return wrapper
+
+    def _patch(self, signal):
+        original = signal._live_receivers
+
+        def live_receivers(sender):
+            receivers = original(sender)
+            if isinstance(receivers, tuple):
+                # django >= 5.0 splits sync and async receivers
+                sync_receivers, async_receivers = receivers
+                return [self._wrap(signal, r) for r in sync_receivers], async_receivers
+            return [self._wrap(signal, r) for r in receivers]
+
+        signal._live_receivers = live_receivers
+
+    def install(self):
+        for signal in self.signals:
+            self._patch(signal)
+
+    def uninstall(self):
+        for signal in self.signals:
+            # drop the instance attribute and expose the class method again
+            signal.__dict__.pop("_live_receivers", None)
+        self._wrappers = {}
+
+    def __enter__(self):
+        self.install()
+        return self
+
+    # noinspection PyShadowingBuiltins
+    def __exit__(self, type, value, traceback):
+        self.uninstall()
@@ -4,4 +4,8 @@ import nox
 def docs(session):
     session.run('pylliterate', 'build')
     session.run('mkdocs', 'build')
-    session.run('mkdocs', 'gh-deploy')
\ No newline at end of file
+    session.run('mkdocs', 'gh-deploy')
+
+@nox.session(python=False)
+def import_cost(session):
+    session.run('python', 'benchmarks/import_cost.py', *session.posargs)
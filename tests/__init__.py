@@ -0,0 +1,16 @@
+import django
+from django.conf import settings
+from django.core.management import call_command
+
+# The checks run against the django contrib models over an in memory database:
+#
+#     python -m unittest
+
+if not settings.configured:
+    settings.configure(
+        INSTALLED_APPS=["django.contrib.contenttypes", "django.contrib.auth"],
+        DATABASES={"default": {"ENGINE": "django.db.backends.sqlite3", "NAME": ":memory:"}},
+        DEFAULT_AUTO_FIELD="django.db.models.AutoField",
+    )
+    django.setup()
+    call_command("migrate", verbosity=0)
@@ -0,0 +1,44 @@
+from django.contrib.auth.models import Group, Permission
+from django.test import TestCase
+from rest_framework import serializers
+
+from dauto.drf.planner import plan
+
+
+class PermissionSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Permission
+        fields = ["id", "codename"]
+
+
+class GroupSerializer(serializers.ModelSerializer):
+    permissions = serializers.SlugRelatedField(many=True, read_only=True, slug_field="codename")
+    keys = serializers.PrimaryKeyRelatedField(many=True, read_only=True, source="permissions")
+
+    class Meta:
+        model = Group
+        fields = ["id", "permissions", "keys"]
+
+
+class PlanTestCase(TestCase):
+    def test_keeps_the_queryset_select_related(self):
+        # `only()` must not defer a relation the queryset already joins
+        queryset = plan(Permission.objects.select_related("content_type"), PermissionSerializer)
+        permission = list(queryset)[0]
+        with self.assertNumQueries(0):
+            self.assertIsNotNone(permission.content_type.model)
+
+    def test_keeps_the_queryset_deferred_columns(self):
+        queryset = plan(Permission.objects.only("name"), PermissionSerializer)
+        self.assertTrue(list(queryset))
+
+    def test_restricts_the_columns(self):
+        queryset = plan(Permission.objects.all(), PermissionSerializer)
+        self.assertEqual(queryset.query.deferred_loading, ({"id", "codename"}, False))
+
+    def test_loads_the_columns_of_many_related_items(self):
+        group = Group.objects.create(name="staff")
+        group.permissions.set(Permission.objects.all()[:5])
+        with self.assertNumQueries(2):
+            data = GroupSerializer(plan(Group.objects.all(), GroupSerializer), many=True).data
+        self.assertEqual(len(data[0]["permissions"]), 5)